@@ -21,6 +21,11 @@ which determines where users will be redirected if they are not authenticated.
 
 Imports:
     - `routes` and `models`: Modules where the routes and database models for the app are defined.
+    - `commands`: Module registering the `flask` CLI commands (e.g. `send-reminders`).
+    - `assets`: Module serving content-fingerprinted static assets with long cache lifetimes.
+    - `compression`: Module compressing responses according to `Accept-Encoding`.
+    - `templating`: Module sharing compiled templates and caching rendered fragments.
+    - `jobs`: Module running long operations on a persistent background job queue.
 
 This module essentially sets up all the essential Flask extensions needed for the application 
 to function properly and manage user sessions, database interactions, and email communication.
@@ -43,4 +48,4 @@ ph = PasswordHasher()
 
 login_manager.login_view = 'login'
 
-from app import routes, models
\ No newline at end of file
+from app import templating, routes, models, commands, assets, compression, jobs
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""
+Fingerprinted static assets.
+
+Every file under `app/static` gets a content hash in its name
+(`css/style.css` -> `css/style.3f9a0c1b2d4e.css`). The mapping is read from the
+manifest written by `flask build-assets`, or computed at startup when there is
+none. Templates link assets through `asset_url()`, and the `/assets/` endpoint
+serves the fingerprinted names with a one year `immutable` cache lifetime, so
+returning browsers never revalidate them; a changed file simply gets a new URL.
+Compression (including precompressed `.gz`/`.br` variants) is applied by
+`app.compression` as for regular static files.
+"""
+import hashlib
+import json
+import os
+
+from flask import abort, send_from_directory, url_for
+
+from app import app
+
+MANIFEST_NAME = 'manifest.json'
+SKIPPED_SUFFIXES = ('.gz', '.br')
+ONE_YEAR = 365 * 24 * 60 * 60
+
+_manifest = {}
+_originals = {}
+
+
+def _fingerprint(filename, data):
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    stem, ext = os.path.splitext(filename)
+    return f'{stem}.{digest}{ext}'
+
+
+def build_manifest():
+    """
+    map every static file to its fingerprinted name
+    """
+    manifest = {}
+    for root, _, files in os.walk(app.static_folder):
+        for name in sorted(files):
+            if name == MANIFEST_NAME or name.endswith(SKIPPED_SUFFIXES):
+                continue
+            path = os.path.join(root, name)
+            filename = os.path.relpath(path, app.static_folder).replace(os.sep, '/')
+            with open(path, 'rb') as file:
+                manifest[filename] = _fingerprint(filename, file.read())
+    return manifest
+
+
+def write_manifest():
+    """
+    build the manifest, save it next to the assets and start using it
+    """
+    manifest = build_manifest()
+    with open(os.path.join(app.static_folder, MANIFEST_NAME), 'w') as file:
+        json.dump(manifest, file, indent=4, sort_keys=True)
+    load_manifest(manifest)
+    return manifest
+
+
+def load_manifest(manifest=None):
+    """
+    use the given manifest, the saved one, or a freshly built one
+    """
+    if manifest is None:
+        path = os.path.join(app.static_folder, MANIFEST_NAME)
+        if os.path.isfile(path):
+            with open(path) as file:
+                manifest = json.load(file)
+        else:
+            manifest = build_manifest()
+    _manifest.clear()
+    _manifest.update(manifest)
+    _originals.clear()
+    _originals.update({fingerprinted: name for name, fingerprinted in manifest.items()})
+
+
+def original_filename(fingerprinted):
+    """
+    static file a fingerprinted name stands for, or None
+    """
+    return _originals.get(fingerprinted)
+
+
+@app.template_global()
+def asset_url(filename):
+    """
+    URL of a static file that can be cached forever
+    """
+    if app.config['ASSETS_FINGERPRINT'] and filename in _manifest:
+        return url_for('assets', filename=_manifest[filename])
+    return url_for('static', filename=filename)
+
+
+@app.route('/assets/<path:filename>')
+def assets(filename):
+    """
+    serving fingerprinted static files
+    """
+    original = original_filename(filename)
+    if original is None:
+        abort(404)
+    response = send_from_directory(app.static_folder, original, max_age=ONE_YEAR)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+load_manifest()
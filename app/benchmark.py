@@ -0,0 +1,116 @@
+"""
+Listing page benchmark.
+
+Seeds the configured database with one user owning a large deck, a long
+progress history and many notifications, then requests the pages that list them
+(search, deck view, progress, notifications and the JSON and CSV exports)
+through the Flask test client. Every page is timed over a few runs with the
+fragment cache cleared, and one more run is traced with `tracemalloc` for its
+peak memory, which is what the read models in `app.read_models` keep low.
+
+    DATABASE_URL=sqlite:////tmp/bench.db flask benchmark --seed --cards 50000
+"""
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from app import app, db
+from app.models import User, Deck, Flashcard, Notification, Progress
+from app.templating import fragments
+
+BENCHMARK_USER = 'benchmark'
+
+
+def seed(cards):
+    """
+    create the benchmark user and deck unless they exist; returns whether they
+    were created
+    """
+    if db.session.execute(select(User.id).where(User.username == BENCHMARK_USER)).first():
+        return False
+    user = User(username=BENCHMARK_USER, email=f'{BENCHMARK_USER}@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    deck = Deck(title='Benchmark', description='benchmark deck', user_id=user.id)
+    db.session.add(deck)
+    db.session.flush()
+    now = datetime.utcnow()
+    db.session.execute(insert(Flashcard), [{
+        'deck_id': deck.id,
+        'question': f'Question number {i} about topic',
+        'answer': f'Answer {i} with some text',
+        'content_hash': Flashcard.compute_content_hash(f'Question number {i} about topic'),
+        'next_review': now,
+    } for i in range(cards)])
+    db.session.execute(insert(Progress), [{
+        'user_id': user.id, 'deck_id': deck.id, 'cards_reviewed': i % 50,
+        'date': now - timedelta(hours=i),
+    } for i in range(cards // 5)])
+    db.session.execute(insert(Notification), [{
+        'user_id': user.id, 'message': f'Reminder {i}', 'is_read': bool(i % 2),
+        'timestamp': now - timedelta(minutes=i),
+    } for i in range(cards // 5)])
+    db.session.commit()
+    return True
+
+
+def _get(client, path):
+    response = client.get(path)
+    response.get_data()
+    if response.status_code != 200:
+        raise RuntimeError(f'GET {path} returned {response.status_code}.')
+
+
+def run(runs=5):
+    """
+    median time and peak memory of every listing page; returns them by page
+    """
+    with app.app_context():
+        user_id, deck_id = db.session.execute(
+            select(User.id, Deck.id).join(Deck, Deck.user_id == User.id)
+            .where(User.username == BENCHMARK_USER)
+        ).first() or (None, None)
+    if user_id is None:
+        raise RuntimeError('No benchmark data; run with --seed first.')
+    pages = {
+        'search': '/search?query=Question',
+        'view_deck': f'/deck/{deck_id}',
+        'progress': '/progress',
+        'notifications': '/notifications',
+        'export_json': f'/deck/{deck_id}/export/json',
+        'export_csv': f'/deck/{deck_id}/export/csv',
+    }
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+    result = {}
+    for name, path in pages.items():
+        times = []
+        for _ in range(runs):
+            fragments.clear()
+            started = time.perf_counter()
+            _get(client, path)
+            times.append(time.perf_counter() - started)
+        fragments.clear()
+        tracemalloc.start()
+        try:
+            _get(client, path)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        result[name] = {'median': statistics.median(times), 'peak': peak}
+    return result
+
+
+def format_report(result):
+    """
+    render a benchmark result as a plain text table
+    """
+    lines = [f'{"page":<16}{"median ms":>11}{"peak MiB":>10}']
+    for name, page in result.items():
+        lines.append(f'{name:<16}{page["median"] * 1000:>11.1f}{page["peak"] / 2 ** 20:>10.1f}')
+    return '\n'.join(lines)
@@ -0,0 +1,161 @@
+"""
+Server-side deck cloning.
+
+Copies a deck and its cards for other users without loading a single card into
+Python. For each batch of target users (`CLONE_BATCH_SIZE`):
+
+    - one `INSERT ... SELECT` over `user` creates their decks, each pointing
+      back at the original through `source_deck_id`;
+    - one `INSERT ... SELECT` joins the original's cards with the new decks and
+      copies them all;
+    - one `INSERT ... SELECT` gives every new deck its `DeckStats` row.
+
+With `reset_scheduling` (the default) the copies start as new cards, due now;
+otherwise they keep the original's review state. Users that already have a
+clone of the deck are skipped, so a fan-out that was interrupted can simply be
+run again; a unique index on `(source_deck_id, user_id)` keeps concurrent clones
+from giving a user two copies. Large fan-outs run as the `clone_deck` background job.
+"""
+from datetime import datetime
+from itertools import islice
+
+from flask import current_app
+from sqlalchemy import case, func, insert, literal, select, true
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.jobs import JobFailed, job_handler
+from app.models import Deck, DeckStats, Flashcard, User
+
+_deck = Deck.__table__
+_flashcard = Flashcard.__table__
+_user = User.__table__
+
+CARD_COLUMNS = ('question', 'answer', 'content_hash', 'difficulty', 'next_review', 'interval',
+                'repetitions', 'ease_factor')
+
+
+def _card_values(reset_scheduling, now):
+    card = _flashcard.c
+    if not reset_scheduling:
+        return [card[name] for name in CARD_COLUMNS]
+    return [card.question, card.answer, card.content_hash, literal(1),
+            literal(now, card.next_review.type), literal(1), literal(0), literal(2.5)]
+
+
+def _source_totals(deck_id, reset_scheduling):
+    """
+    statistics every clone of the deck starts with
+    """
+    card = _flashcard.c
+    count, ease_sum, mastered = db.session.execute(
+        select(func.count(), func.coalesce(func.sum(func.coalesce(card.ease_factor, 2.5)), 0.0),
+               func.coalesce(func.sum(case((card.interval >= DeckStats.MASTERED_INTERVAL, 1),
+                                           else_=0)), 0))
+        .where(card.deck_id == deck_id)
+    ).one()
+    if reset_scheduling:
+        return count, 2.5 * count, 0
+    return count, ease_sum, mastered
+
+
+def _batches(user_ids, size):
+    iterator = iter(user_ids)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def clone_deck_to_users(deck, user_ids, reset_scheduling=True, batch_size=None, progress=None):
+    """
+    give every user in `user_ids` their own copy of `deck`; `progress` is called
+    with the number of users handled after every batch. Returns the number of
+    decks created.
+    """
+    batch_size = batch_size or current_app.config['CLONE_BATCH_SIZE']
+    now = datetime.utcnow()
+    card_count, ease_sum, mastered = _source_totals(deck.id, reset_scheduling)
+    created = handled = 0
+
+    for batch in _batches(user_ids, batch_size):
+        handled += len(batch)
+        cloned = set(db.session.execute(
+            select(_deck.c.user_id).where(_deck.c.source_deck_id == deck.id, _deck.c.user_id.in_(batch))
+        ).scalars())
+        targets = [user_id for user_id in batch if user_id not in cloned]
+        if targets:
+            db.session.execute(insert(_deck).from_select(
+                ['title', 'description', 'user_id', 'version', 'source_deck_id'],
+                select(literal(deck.title), literal(deck.description), _user.c.id, literal(1),
+                       literal(deck.id)).where(_user.c.id.in_(targets))
+            ))
+            new_decks = select(_deck.c.id).where(
+                _deck.c.source_deck_id == deck.id, _deck.c.user_id.in_(targets)).subquery()
+            db.session.execute(insert(_flashcard).from_select(
+                ['deck_id', *CARD_COLUMNS],
+                select(new_decks.c.id, *_card_values(reset_scheduling, now))
+                .select_from(_flashcard.join(new_decks, true()))
+                .where(_flashcard.c.deck_id == deck.id)
+                .order_by(new_decks.c.id, _flashcard.c.id)
+            ))
+            created += db.session.execute(insert(DeckStats.__table__).from_select(
+                ['deck_id', 'card_count', 'ease_sum', 'mastered_count'],
+                select(new_decks.c.id, literal(card_count), literal(ease_sum), literal(mastered))
+            )).rowcount
+            db.session.commit()
+        if progress is not None:
+            progress(handled)
+    return created
+
+
+def clone_deck(deck, user, reset_scheduling=True):
+    """
+    a user's copy of a deck, made if they have none yet; returns it and whether
+    it was created
+    """
+    existing = Deck.query.filter_by(source_deck_id=deck.id, user_id=user.id).first()
+    if existing is not None:
+        return existing, False
+    try:
+        clone_deck_to_users(deck, [user.id], reset_scheduling)
+    except IntegrityError:
+        # a concurrent request made the copy first
+        db.session.rollback()
+        return Deck.query.filter_by(source_deck_id=deck.id, user_id=user.id).one(), False
+    return Deck.query.filter_by(source_deck_id=deck.id, user_id=user.id).one(), True
+
+
+def all_user_ids(exclude=None, batch_size=1000):
+    """
+    every user id but `exclude`, read in keyset-paginated batches
+    """
+    after = 0
+    while True:
+        ids = db.session.execute(
+            select(_user.c.id).where(_user.c.id > after, _user.c.id != exclude)
+            .order_by(_user.c.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return
+        yield from ids
+        after = ids[-1]
+
+
+@job_handler('clone_deck')
+def clone_deck_job(context, deck_id, user_ids=None, reset_scheduling=True):
+    """
+    fan a deck out to `user_ids`, or to every other user
+    """
+    deck = db.session.get(Deck, deck_id)
+    if deck is None:
+        raise JobFailed(f'No deck {deck_id}.')
+    if user_ids is None:
+        total = db.session.query(func.count(User.id)).filter(User.id != deck.user_id).scalar()
+        user_ids = all_user_ids(exclude=deck.user_id)
+    else:
+        total = len(user_ids)
+    created = clone_deck_to_users(deck, user_ids, reset_scheduling,
+                                  progress=lambda done: context.progress(done, total))
+    return {'decks_created': created}
@@ -0,0 +1,245 @@
+"""
+Command line entry points registered on `flask`.
+
+These are meant to be run from cron or a process supervisor next to the web
+workers, e.g. `flask send-reminders` once a minute and `flask jobs-work` under a
+supervisor.
+"""
+import multiprocessing
+import time
+
+import click
+
+from app import app
+from app.assets import write_manifest
+from app.compression import precompress_static
+from app.templating import compile_templates
+from app import benchmark, forecast, loadtest
+from app.cloning import all_user_ids, clone_deck_to_users
+from app.jobs import WorkerPool, enqueue, run_worker_process
+from app.imports import import_flashcards, import_target_deck
+from app.maintenance import enable_incremental_vacuum, run_maintenance
+from app.models import Deck, User
+from app.packages import PackageReader, write_package
+from app.reminders import dispatch_reminders, run_every_minute, wait_for_emails
+
+
+@app.cli.command('send-reminders')
+@click.option('--loop', is_flag=True, help='Keep running and dispatch once a minute.')
+@click.option('--queue', is_flag=True, help='Hand the dispatch to the job workers instead.')
+def send_reminders(loop, queue):
+    """
+    notify users whose reminder time is now and who have cards due
+    """
+    if queue:
+        job = enqueue('dispatch_reminders', priority=10)
+        click.echo(f'Queued job {job.id}.')
+        return
+    if loop:
+        run_every_minute()
+    count = dispatch_reminders()
+    wait_for_emails()
+    click.echo(f'Reminded {count} users.')
+
+
+@app.cli.command('compress-static')
+def compress_static():
+    """
+    write precompressed .gz/.br copies of the static assets
+    """
+    written = precompress_static()
+    click.echo(f'Wrote {len(written)} precompressed files.')
+
+
+@app.cli.command('build-assets')
+def build_assets():
+    """
+    fingerprint the static assets and precompress them
+    """
+    manifest = write_manifest()
+    written = precompress_static()
+    click.echo(f'Fingerprinted {len(manifest)} assets, wrote {len(written)} precompressed files.')
+
+
+@app.cli.command('compile-templates')
+def compile_templates_command():
+    """
+    fill the Jinja bytecode cache with every template
+    """
+    names = compile_templates()
+    click.echo(f'Compiled {len(names)} templates.')
+
+
+@app.cli.command('export-deck')
+@click.argument('deck_id', type=int)
+@click.argument('path', type=click.Path(dir_okay=False, writable=True))
+def export_deck(deck_id, path):
+    """
+    write a deck, scheduling included, to a binary deck package
+    """
+    deck = Deck.query.get(deck_id)
+    if deck is None:
+        raise click.ClickException(f'No deck {deck_id}.')
+    with open(path, 'wb') as file:
+        for chunk in write_package(deck):
+            file.write(chunk)
+    click.echo(f'Exported "{deck.title}" to {path}.')
+
+
+@app.cli.command('import-deck')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.argument('user_id', type=int)
+@click.option('--on-duplicate', type=click.Choice(['skip', 'update', 'merge']), default='skip')
+def import_deck(path, user_id, on_duplicate):
+    """
+    import a binary deck package for a user
+    """
+    user = User.query.get(user_id)
+    if user is None:
+        raise click.ClickException(f'No user {user_id}.')
+    with PackageReader(path) as package:
+        deck, _ = import_target_deck(user, package.meta['title'], package.meta.get('description') or '')
+        result = import_flashcards(deck.id, package.cards(), on_duplicate=on_duplicate)
+    click.echo(f'Imported into deck {deck.id}: {result.created} added, '
+               f'{result.updated} updated, {result.skipped} duplicates skipped.')
+
+
+@app.cli.command('loadtest')
+@click.option('--seed', 'seed_learners', is_flag=True, help='Create the learners first.')
+@click.option('--learners', default=10, show_default=True, help='Concurrent simulated learners.')
+@click.option('--decks', default=2, show_default=True, help='Decks per seeded learner.')
+@click.option('--cards', default=200, show_default=True, help='Cards per seeded deck.')
+@click.option('--duration', default=30.0, show_default=True, help='Seconds to run for.')
+@click.option('--think-time', default=0.5, show_default=True,
+              help='Mean pause between a learner\'s requests, in seconds.')
+@click.option('--mode', type=click.Choice(['client', 'server', 'url']), default='client',
+              show_default=True, help='Test client, local HTTP server, or --url.')
+@click.option('--url', help='Base URL of a running server for --mode url.')
+def loadtest_command(seed_learners, learners, decks, cards, duration, think_time, mode, url):
+    """
+    simulate concurrent learners and report latency per endpoint
+    """
+    if mode == 'url' and not url:
+        raise click.UsageError('--mode url needs --url.')
+    if seed_learners:
+        created = loadtest.seed(learners, decks, cards)
+        click.echo(f'Seeded {created} learners.')
+    try:
+        result = loadtest.run(learners, duration=duration, think_time=think_time,
+                              mode=mode, url=url)
+    except RuntimeError as error:
+        raise click.ClickException(str(error))
+    click.echo(loadtest.format_report(result))
+
+
+@app.cli.command('benchmark')
+@click.option('--seed', 'seed_cards', is_flag=True, help='Create the benchmark deck first.')
+@click.option('--cards', default=50000, show_default=True, help='Cards in the seeded deck.')
+@click.option('--runs', default=5, show_default=True, help='Timed requests per page.')
+def benchmark_command(seed_cards, cards, runs):
+    """
+    time the listing pages and report their peak memory
+    """
+    if seed_cards and benchmark.seed(cards):
+        click.echo(f'Seeded a deck of {cards} cards.')
+    try:
+        result = benchmark.run(runs)
+    except RuntimeError as error:
+        raise click.ClickException(str(error))
+    click.echo(benchmark.format_report(result))
+
+
+@app.cli.command('maintenance')
+@click.option('--max-rows-per-second', type=int, help='Throughput cap (default from config).')
+@click.option('--max-seconds', type=float, help='Stop after this long; the next run resumes.')
+@click.option('--loop', is_flag=True, help='Keep running, once every --interval seconds.')
+@click.option('--interval', default=3600, show_default=True, help='Seconds between runs with --loop.')
+@click.option('--enable-incremental-vacuum', 'switch_vacuum', is_flag=True,
+              help='Switch SQLite to incremental auto-vacuum first (one full VACUUM).')
+def maintenance(max_rows_per_second, max_seconds, loop, interval, switch_vacuum):
+    """
+    archive old notifications, compact old progress, repair deck statistics and
+    optimize the database
+    """
+    if switch_vacuum:
+        if enable_incremental_vacuum():
+            click.echo('Switched the database to incremental auto-vacuum.')
+        else:
+            click.echo('Incremental auto-vacuum is already on or not applicable.')
+    while True:
+        summary = run_maintenance(max_rows_per_second, max_seconds)
+        click.echo(f'Archived {summary["notifications_archived"]} notifications, '
+                   f'removed {summary["progress_rows_removed"]} progress rows, '
+                   f'repaired the statistics of {summary["deck_stats_repaired"]} decks'
+                   f'{"" if summary["vacuumed"] else ", skipped VACUUM"}.')
+        if not loop:
+            break
+        time.sleep(interval)
+
+
+@app.cli.command('jobs-work')
+@click.option('--workers', default=2, show_default=True, help='Worker threads per process.')
+@click.option('--processes', default=1, show_default=True, help='Worker processes to run.')
+def jobs_work(workers, processes):
+    """
+    run background jobs until interrupted
+    """
+    children = [multiprocessing.get_context('spawn').Process(target=run_worker_process, args=(workers,))
+                for _ in range(processes - 1)]
+    for child in children:
+        child.start()
+    click.echo(f'Running {workers * processes} job workers in {processes} processes.')
+    try:
+        WorkerPool(workers).start().wait()
+    finally:
+        for child in children:
+            child.terminate()
+            child.join()
+
+
+@app.cli.command('forecast')
+@click.option('--days', default=30, show_default=True, help='Days to forecast.')
+@click.option('--rating', type=click.IntRange(1, 3), help='Assumed rating of every review (default from config).')
+@click.option('--workers', type=int, help='Worker processes (default: one per CPU).')
+@click.option('--deck', 'deck_id', type=int, help='Forecast a single deck.')
+@click.option('--user', 'user_id', type=int, help="Forecast a single user's decks.")
+def forecast_command(days, rating, workers, deck_id, user_id):
+    """
+    print the number of reviews expected on each of the next days
+    """
+    if deck_id:
+        histogram = forecast.deck_forecast(deck_id, days, rating)
+    elif user_id:
+        histogram = forecast.user_forecast(user_id, days, rating)
+    else:
+        histogram = forecast.global_forecast(days, rating, workers)
+    result = forecast.as_json(histogram)
+    for day, count in enumerate(result['days']):
+        click.echo(f'+{day:<4d} {count}')
+    click.echo(f'Total {result["total"]} reviews, peak {result["peak"]} a day.')
+
+
+@app.cli.command('clone-deck')
+@click.argument('deck_id', type=int)
+@click.option('--user', 'user_ids', type=int, multiple=True, help='Target user (repeatable).')
+@click.option('--all-users', is_flag=True, help='Give every other user a copy.')
+@click.option('--keep-scheduling', is_flag=True, help="Keep the original cards' review state.")
+@click.option('--queue', is_flag=True, help='Hand the fan-out to the job workers instead.')
+def clone_deck_command(deck_id, user_ids, all_users, keep_scheduling, queue):
+    """
+    copy a deck and its cards to other users inside the database
+    """
+    if bool(user_ids) == all_users:
+        raise click.UsageError('Pass either --user or --all-users.')
+    deck = Deck.query.get(deck_id)
+    if deck is None:
+        raise click.ClickException(f'No deck {deck_id}.')
+    if queue:
+        job = enqueue('clone_deck', {'deck_id': deck.id, 'user_ids': list(user_ids) or None,
+                                     'reset_scheduling': not keep_scheduling})
+        click.echo(f'Queued job {job.id}.')
+        return
+    targets = all_user_ids(exclude=deck.user_id) if all_users else user_ids
+    started = time.monotonic()
+    created = clone_deck_to_users(deck, targets, reset_scheduling=not keep_scheduling)
+    click.echo(f'Cloned "{deck.title}" to {created} users in {time.monotonic() - started:.1f}s.')
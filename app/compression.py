@@ -0,0 +1,205 @@
+"""
+Response compression.
+
+Every response whose mimetype is in `COMPRESS_MIMETYPES` is compressed with the
+best encoding the client offers in `Accept-Encoding` (brotli when the optional
+`brotli` package is installed, gzip otherwise):
+
+    - buffered responses below `COMPRESS_MIN_SIZE` bytes are sent as they are;
+    - streamed responses (generators, `send_file`) are compressed chunk by chunk
+      as they are sent, never buffered whole;
+    - static files, including fingerprinted ones from `app.assets`, are served
+      from precompressed variants, either the `.gz`/`.br` siblings written by
+      `flask compress-static` or, failing that, a copy compressed on first
+      request and kept in memory.
+
+A strong `ETag` on a compressed response is made weak, since it described the
+uncompressed bytes.
+"""
+import mimetypes
+import os
+import zlib
+
+from flask import request
+from werkzeug.security import safe_join
+
+from app import app
+from app.assets import MANIFEST_NAME, original_filename
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SUFFIXES = {'gzip': '.gz', 'br': '.br'}
+
+_static_cache = {}
+
+
+class _GzipCompressor:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def available_encodings():
+    """
+    encodings this server can produce, preferred first
+    """
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def compressor(encoding, static=False):
+    """
+    new incremental compressor; static assets get the slowest, smallest settings
+    """
+    if encoding == 'br':
+        return _BrotliCompressor(11 if static else app.config['COMPRESS_BROTLI_QUALITY'])
+    return _GzipCompressor(9 if static else app.config['COMPRESS_LEVEL'])
+
+
+def compress_bytes(data, encoding, static=False):
+    """
+    compress a whole buffer in one go
+    """
+    compress = compressor(encoding, static)
+    return compress.compress(data) + compress.finish()
+
+
+def _compress_stream(chunks, encoding):
+    compress = compressor(encoding)
+    for chunk in chunks:
+        data = compress.compress(chunk)
+        if data:
+            yield data
+    yield compress.finish()
+
+
+def _static_variant(filename, encoding):
+    """
+    compressed bytes of a static file, preferring an up to date file on disk
+    """
+    path = safe_join(app.static_folder, filename)
+    if path is None or not os.path.isfile(path):
+        return None
+    mtime = os.path.getmtime(path)
+    key = (path, encoding)
+    cached = _static_cache.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    variant = path + SUFFIXES[encoding]
+    if os.path.isfile(variant) and os.path.getmtime(variant) >= mtime:
+        with open(variant, 'rb') as file:
+            data = file.read()
+    else:
+        with open(path, 'rb') as file:
+            data = compress_bytes(file.read(), encoding, static=True)
+    _static_cache[key] = (mtime, data)
+    return data
+
+
+def precompress_static():
+    """
+    write `.gz` (and `.br`) siblings next to every compressible static file;
+    returns the paths written
+    """
+    written = []
+    allowed = set(app.config['COMPRESS_MIMETYPES'])
+    for root, _, files in os.walk(app.static_folder):
+        for name in files:
+            if name == MANIFEST_NAME or os.path.splitext(name)[1] in SUFFIXES.values():
+                continue
+            path = os.path.join(root, name)
+            filename = os.path.relpath(path, app.static_folder)
+            if mimetypes.guess_type(filename)[0] not in allowed:
+                continue
+            with open(path, 'rb') as file:
+                data = file.read()
+            for encoding in available_encodings():
+                with open(path + SUFFIXES[encoding], 'wb') as file:
+                    file.write(compress_bytes(data, encoding, static=True))
+                written.append(path + SUFFIXES[encoding])
+    return written
+
+
+def _static_filename():
+    """
+    static file the current request serves, if any
+    """
+    if not request.view_args or 'filename' not in request.view_args:
+        return None
+    if request.endpoint == 'static':
+        return request.view_args['filename']
+    if request.endpoint == 'assets':
+        return original_filename(request.view_args['filename'])
+    return None
+
+
+def _is_compressible(response):
+    if request.method == 'HEAD' or response.status_code in (204, 206, 304):
+        return False
+    if response.status_code < 200 or 'Content-Encoding' in response.headers:
+        return False
+    return response.mimetype in app.config['COMPRESS_MIMETYPES']
+
+
+@app.after_request
+def compress_response(response):
+    """
+    compress the response body in the encoding negotiated from Accept-Encoding
+    """
+    if not app.config['COMPRESS_ENABLED'] or not _is_compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if encoding is None:
+        return response
+
+    filename = _static_filename()
+    if filename is not None:
+        data = _static_variant(filename, encoding)
+        if data is None:
+            return response
+        response.close()
+        response.direct_passthrough = False
+        response.set_data(data)
+    elif response.is_streamed:
+        length = response.content_length
+        if length is not None and length < app.config['COMPRESS_MIN_SIZE']:
+            return response
+        chunks = response.iter_encoded()
+        if hasattr(response.response, 'close'):
+            response.call_on_close(response.response.close)
+        response.direct_passthrough = False
+        response.response = _compress_stream(chunks, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+        response.set_data(compress_bytes(data, encoding))
+
+    response.headers['Content-Encoding'] = encoding
+    # the compressed body is a different byte sequence than the one a strong
+    # ETag promised; a weak one still lets conditional requests revalidate
+    etag, weak = response.get_etag()
+    if etag is not None and not weak:
+        response.set_etag(etag, weak=True)
+    return response
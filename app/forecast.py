@@ -0,0 +1,180 @@
+"""
+Review-load forecast.
+
+Loads the scheduling columns of the cards (`next_review`, `interval`,
+`repetitions`, `ease_factor`) into NumPy arrays and replays the SM-2 rules of
+`Flashcard.update_review` for every card at once, assuming each review gets the
+same rating (`FORECAST_RATING`, "good" by default). Every pass reviews all the
+cards due within the horizon, counts them on their due day and moves them to
+their next due day, until none is left in the horizon. Overdue cards count on
+day 0.
+
+The result is a histogram: element `i` is the number of reviews expected `i`
+days from now. `deck_forecast` and `user_forecast` work on one deck or one
+user's decks; `global_forecast` splits all cards into id ranges and forecasts
+them in a process pool, each worker reading its range through its own database
+connection, for capacity planning. An in-memory SQLite database cannot be
+opened from another process, so its chunks are forecast in-process instead.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import create_engine, func, select
+
+from app import db
+from app.models import Deck, Flashcard
+
+_flashcard = Flashcard.__table__.c
+COLUMNS = (_flashcard.next_review, _flashcard.interval, _flashcard.repetitions,
+           _flashcard.ease_factor)
+DAY = np.timedelta64(1, 'D')
+
+_engines = {}
+
+
+def _arrays(rows):
+    """
+    scheduling columns as arrays, with the model defaults filled in
+    """
+    next_review, interval, repetitions, ease_factor = zip(*rows) if rows else ((),) * 4
+    return (
+        np.array(next_review, dtype='datetime64[us]'),
+        np.array([1 if value is None else value for value in interval], dtype=np.int64),
+        np.array([0 if value is None else value for value in repetitions], dtype=np.int64),
+        np.array([2.5 if value is None else value for value in ease_factor], dtype=np.float64),
+    )
+
+
+def simulate(next_review, interval, repetitions, ease_factor, days, rating=2, now=None):
+    """
+    reviews expected on each of the next `days` days
+    """
+    if not 1 <= rating <= 3:
+        raise ValueError("Rating must be between 1 and 3.")
+    now = np.datetime64(now or datetime.utcnow(), 'us')
+    due = (next_review - now) // DAY
+    due = np.where(np.isnat(next_review), 0, np.maximum(due, 0))
+    interval = interval.copy()
+    repetitions = repetitions.copy()
+    ease_factor = ease_factor.copy()
+    histogram = np.zeros(days, dtype=np.int64)
+    ease_change = 0.1 - (3 - rating) * (0.08 + (3 - rating) * 0.02)
+
+    active = np.flatnonzero(due < days)
+    while active.size:
+        histogram += np.bincount(due[active], minlength=days)
+        ease = np.maximum(1.3, ease_factor[active] + ease_change)
+        ease_factor[active] = ease
+        if rating >= 2:
+            reps = repetitions[active] + 1
+            step = np.where(reps == 1, 1, np.where(reps == 2, 6,
+                            (interval[active] * ease).astype(np.int64)))
+            # imported cards may carry a zero or negative interval; every
+            # review moves a card at least one day on
+            step = np.maximum(step, 1)
+        else:
+            reps = np.zeros_like(active)
+            step = np.ones_like(active)
+        repetitions[active] = reps
+        interval[active] = step
+        due[active] += step
+        active = active[due[active] < days]
+    return histogram
+
+
+def _forecast(statement, days, rating, now):
+    rows = db.session.execute(statement).all()
+    return simulate(*_arrays(rows), days, rating, now)
+
+
+def _settings(days, rating):
+    days = max(1, min(days or 30, current_app.config['FORECAST_MAX_DAYS']))
+    return days, current_app.config['FORECAST_RATING'] if rating is None else rating
+
+
+def deck_forecast(deck_id, days=None, rating=None, now=None):
+    """
+    daily review histogram of one deck
+    """
+    days, rating = _settings(days, rating)
+    return _forecast(select(*COLUMNS).where(_flashcard.deck_id == deck_id), days, rating, now)
+
+
+def user_forecast(user_id, days=None, rating=None, now=None):
+    """
+    daily review histogram of all of a user's decks
+    """
+    days, rating = _settings(days, rating)
+    deck_ids = select(Deck.__table__.c.id).where(Deck.__table__.c.user_id == user_id)
+    return _forecast(select(*COLUMNS).where(_flashcard.deck_id.in_(deck_ids)), days, rating, now)
+
+
+def _chunk(low, high):
+    return select(*COLUMNS).where(_flashcard.id >= low, _flashcard.id < high)
+
+
+def _forecast_chunk(url, low, high, days, rating, now):
+    """
+    histogram of the cards with `low <= id < high`, run in a pool worker
+    """
+    engine = _engines.get(url)
+    if engine is None:
+        engine = _engines[url] = create_engine(url)
+    with engine.connect() as connection:
+        rows = connection.execute(_chunk(low, high)).all()
+    return simulate(*_arrays(rows), days, rating, now)
+
+
+def _shareable(url):
+    """
+    whether another process opening `url` sees the same database
+    """
+    if url.get_backend_name() != 'sqlite':
+        return True
+    database = url.database or ''
+    return database not in ('', ':memory:') and not database.startswith('file::memory:') \
+        and url.query.get('mode') != 'memory'
+
+
+def global_forecast(days=None, rating=None, workers=None, chunk_size=None, now=None):
+    """
+    daily review histogram of every card, computed in chunks across processes
+    """
+    days, rating = _settings(days, rating)
+    chunk_size = chunk_size or current_app.config['FORECAST_CHUNK_SIZE']
+    now = now or datetime.utcnow()
+    low, high = db.session.execute(select(func.min(_flashcard.id), func.max(_flashcard.id))).one()
+    histogram = np.zeros(days, dtype=np.int64)
+    if low is None:
+        return histogram
+
+    bounds = range(low, high + 1, chunk_size)
+    if not _shareable(db.engine.url):
+        # an in-memory database only exists in this process
+        for start in bounds:
+            histogram += _forecast(_chunk(start, start + chunk_size), days, rating, now)
+        return histogram
+
+    url = db.engine.url.render_as_string(hide_password=False)
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = [pool.submit(_forecast_chunk, url, start, start + chunk_size, days, rating, now)
+                   for start in bounds]
+        for future in futures:
+            histogram += future.result()
+    return histogram
+
+
+def as_json(histogram, now=None):
+    """
+    a histogram as returned by the forecast endpoints
+    """
+    return {
+        'start': (now or datetime.utcnow()).date().isoformat(),
+        'days': histogram.tolist(),
+        'total': int(histogram.sum()),
+        'peak': int(histogram.max()) if histogram.size else 0,
+    }
@@ -0,0 +1,202 @@
+"""
+Deduplicating flashcard imports.
+
+Every card carries a `content_hash` of its normalized question, indexed together
+with its deck. Imports are processed in chunks: each chunk is hashed in Python,
+checked against the deck with a single `(deck_id, content_hash) IN (...)` lookup
+and then written with one bulk insert and one bulk update. Cards whose question
+is already in the deck, whatever their answer, are handled according to
+`on_duplicate`:
+
+    - `skip`: leave the existing card alone.
+    - `update`: replace the existing answer with the imported one.
+    - `merge`: append the imported answer to the existing one if it is new.
+
+Re-importing an unchanged deck therefore costs one index lookup per chunk and
+writes nothing.
+
+Uploaded files are imported by the `import_deck` background job, which reports
+progress after every chunk and can be cancelled between chunks; the upload is
+removed once the job is finished or cancelled.
+"""
+import csv
+import json
+import os
+from collections import namedtuple
+from contextlib import contextmanager
+from itertools import islice
+
+from flask import current_app
+from sqlalchemy import select, update
+
+from app import db
+from app.jobs import JobCancelled, JobFailed, job_handler
+from app.models import Deck, DeckStats, Flashcard, User
+from app.packages import PackageReader
+
+DUPLICATE_ACTIONS = ('skip', 'update', 'merge')
+
+ImportResult = namedtuple('ImportResult', ['created', 'updated', 'skipped'])
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _merge_answers(existing, incoming):
+    if incoming.strip() in existing:
+        return existing
+    return f'{existing}\n{incoming}'
+
+
+def _resolve(current, incoming, on_duplicate):
+    """
+    answer a duplicate ends up with, or None to leave it unchanged
+    """
+    if on_duplicate == 'update' and incoming != current:
+        return incoming
+    if on_duplicate == 'merge':
+        merged = _merge_answers(current, incoming)
+        if merged != current:
+            return merged
+    return None
+
+
+def import_flashcards(deck_id, cards, on_duplicate='skip', chunk_size=None, progress=None):
+    """
+    add `cards` (dicts with `question`, `answer` and optionally scheduling
+    columns) to a deck, deduplicating against the deck and within the import;
+    `progress` is called with the number of cards processed after every chunk
+    """
+    if on_duplicate not in DUPLICATE_ACTIONS:
+        raise ValueError(f'on_duplicate must be one of {", ".join(DUPLICATE_ACTIONS)}.')
+    chunk_size = chunk_size or current_app.config['IMPORT_CHUNK_SIZE']
+    created = updated = skipped = 0
+
+    for chunk in _chunks(cards, chunk_size):
+        incoming = {}
+        for card in chunk:
+            key = Flashcard.compute_content_hash(card['question'])
+            if key in incoming:
+                skipped += 1
+                answer = _resolve(incoming[key]['answer'], card['answer'], on_duplicate)
+                if answer is not None:
+                    incoming[key]['answer'] = answer
+                continue
+            incoming[key] = dict(card, deck_id=deck_id, content_hash=key)
+
+        existing = db.session.execute(
+            select(Flashcard.id, Flashcard.content_hash, Flashcard.answer).where(
+                Flashcard.deck_id == deck_id,
+                Flashcard.content_hash.in_(list(incoming))
+            )
+        ).all()
+
+        changes = []
+        for row in existing:
+            card = incoming.pop(row.content_hash)
+            answer = _resolve(row.answer, card['answer'], on_duplicate)
+            if answer is None:
+                skipped += 1
+            else:
+                changes.append({'id': row.id, 'answer': answer})
+
+        if incoming:
+            db.session.execute(Flashcard.__table__.insert(), list(incoming.values()))
+            DeckStats.apply(db.session.connection(), deck_id, *DeckStats.totals(incoming.values()))
+        if changes:
+            db.session.execute(update(Flashcard), changes)
+        if incoming or changes:
+            Deck.bump_version(db.session.connection(), deck_id)
+            db.session.commit()
+        created += len(incoming)
+        updated += len(changes)
+        if progress is not None:
+            progress(created + updated + skipped)
+
+    return ImportResult(created, updated, skipped)
+
+
+def import_target_deck(user, title, description='', deck_id=None):
+    """
+    deck an import goes into
+
+    Cards only go into an existing deck when the user picked it (`deck_id`);
+    otherwise a new deck is created, even if one has the same title. Returns
+    the deck and whether it was created.
+    """
+    if deck_id:
+        deck = Deck.query.filter_by(id=deck_id, user_id=user.id).first()
+        if deck is not None:
+            return deck, False
+    deck = Deck(title=title, description=description, author=user)
+    db.session.add(deck)
+    db.session.commit()
+    return deck, True
+
+
+@contextmanager
+def read_upload(path, format):
+    """
+    metadata and cards of an uploaded `json`, `csv` or `package` file
+    """
+    if format == 'package':
+        with PackageReader(path) as package:
+            yield package.meta, package.cards()
+        return
+    with open(path, encoding='utf-8', newline='') as file:
+        if format == 'json':
+            data = json.load(file)
+            yield ({'title': data['title'], 'description': data.get('description', '')},
+                   ({'question': card['question'], 'answer': card['answer']}
+                    for card in data['flashcards']))
+        elif format == 'csv':
+            reader = csv.reader(file)
+            next(reader, None)
+            yield {}, ({'question': row[0], 'answer': row[1]} for row in reader)
+        else:
+            raise ValueError(f'Unknown import format {format!r}.')
+
+
+def discard_upload(path, **payload):
+    """
+    remove the upload of an import cancelled before it started
+    """
+    if os.path.exists(path):
+        os.remove(path)
+
+
+@job_handler('import_deck', on_cancel=discard_upload)
+def import_deck_job(context, path, format, user_id, title=None, description='',
+                    deck_id=None, on_duplicate='skip'):
+    """
+    import an uploaded deck file, removing it once it will not be retried
+    """
+    keep_upload = False
+    try:
+        with read_upload(path, format) as (meta, cards):
+            deck, created = import_target_deck(db.session.get(User, user_id),
+                                               meta.get('title') or title or 'Imported Deck',
+                                               meta.get('description') or description or '',
+                                               deck_id)
+            if created:
+                # a retry fills this deck instead of creating another one
+                context.update_payload(deck_id=deck.id)
+            result = import_flashcards(deck.id, cards, on_duplicate=on_duplicate,
+                                       progress=context.progress)
+        return dict(result._asdict(), deck_id=deck.id)
+    except JobCancelled:
+        raise
+    except (ValueError, KeyError, IndexError) as e:
+        raise JobFailed(f'Error importing deck: {e}') from e
+    except Exception:
+        keep_upload = not context.last_attempt
+        raise
+    finally:
+        if not keep_upload:
+            os.remove(path)
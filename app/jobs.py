@@ -0,0 +1,321 @@
+"""
+Persistent background job queue.
+
+Long operations (imports, reminder fan-out, ...) are stored as `Job` rows and
+run by workers outside the request:
+
+    job = enqueue('import_deck', {'path': ...}, user_id=current_user.id)
+    return redirect(url_for('job_page', job_id=job.id))
+
+Handlers are registered with `@job_handler(kind)` and called as
+`handler(context, **payload)`; the value they return is stored as the job result.
+`context.progress(done, total)` reports progress, doubling as the job's
+heartbeat, and raises `JobCancelled` once cancellation was requested, so long
+handlers stop between steps. Raising
+`JobFailed` fails a job without retrying it, for errors another attempt cannot
+fix such as a malformed upload.
+
+Workers claim the highest priority job that is due with a conditional UPDATE, so
+any number of threads and processes can share the queue. A failed attempt is
+retried with exponential backoff until `max_attempts`; jobs left `running` by a
+crashed worker are requeued by the running pools once they missed their
+heartbeat for `JOBS_STALE_AFTER` seconds. Cancelling a job that has not started
+runs the `on_cancel` hook of its kind, e.g. to remove its upload.
+
+Workers run in a `WorkerPool`: `flask jobs-work` starts dedicated ones, and with
+`JOBS_EMBEDDED_WORKERS` the web process starts a small pool on first use. With
+`JOBS_EAGER` jobs run synchronously inside `enqueue`, which is handy in tests.
+"""
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from threading import Event, Lock, Thread
+
+from flask import current_app
+from sqlalchemy import func, update
+
+from app import app, db
+from app.models import Job
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = 'queued', 'running', 'succeeded', 'failed', 'cancelled'
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+_handlers = {}
+_cancel_hooks = {}
+_embedded_pool = None
+_embedded_lock = Lock()
+
+
+class JobCancelled(Exception):
+    """
+    raised inside a handler once its job was cancelled
+    """
+
+
+class JobFailed(Exception):
+    """
+    raised by a handler to fail its job without retrying
+    """
+
+
+def job_handler(kind, on_cancel=None):
+    """
+    register the function running jobs of `kind`; `on_cancel` is called with
+    the payload of a job cancelled before it ran
+    """
+    def register(function):
+        _handlers[kind] = function
+        if on_cancel is not None:
+            _cancel_hooks[kind] = on_cancel
+        return function
+    return register
+
+
+class JobContext:
+    """
+    handle given to a running handler for progress and cancellation
+    """
+
+    def __init__(self, job):
+        self.job_id = job.id
+        # once this attempt fails the job is not retried
+        self.last_attempt = job.attempts >= job.max_attempts
+
+    def progress(self, done, total=None):
+        """
+        record progress; raises `JobCancelled` when the job should stop
+        """
+        db.session.execute(
+            update(Job).where(Job.id == self.job_id)
+            .values(progress_done=done, progress_total=total, heartbeat_at=datetime.utcnow())
+        )
+        db.session.commit()
+        self.check_cancelled()
+
+    def update_payload(self, **values):
+        """
+        change arguments the next attempts of the job are called with
+        """
+        job = db.session.get(Job, self.job_id)
+        job.payload = json.dumps(dict(json.loads(job.payload), **values))
+        db.session.commit()
+
+    def check_cancelled(self):
+        cancelled = db.session.query(Job.cancel_requested).filter(Job.id == self.job_id).scalar()
+        if cancelled:
+            raise JobCancelled()
+
+
+def enqueue(kind, payload=None, user_id=None, priority=0, max_attempts=3):
+    """
+    queue a job; returns it
+    """
+    if kind not in _handlers:
+        raise ValueError(f'No handler for job kind {kind!r}.')
+    job = Job(kind=kind, payload=json.dumps(payload or {}), user_id=user_id,
+              priority=priority, max_attempts=max_attempts)
+    db.session.add(job)
+    db.session.commit()
+
+    if current_app.config['JOBS_EAGER']:
+        if claim(job.id):
+            execute(job.id)
+        db.session.refresh(job)
+    elif current_app.config['JOBS_EMBEDDED_WORKERS']:
+        start_embedded_workers()
+    return job
+
+
+def save_upload(file, suffix=''):
+    """
+    keep an uploaded file around for a job; returns its path
+    """
+    directory = (current_app.config['JOBS_UPLOAD_DIR'] or
+                 os.path.join(current_app.instance_path, 'uploads'))
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, uuid.uuid4().hex + suffix)
+    file.save(path)
+    return path
+
+
+def cancel(job):
+    """
+    cancel a queued job right away, or ask a running one to stop
+    """
+    # conditional updates, so a worker claiming the job in between cannot be
+    # overwritten with a stale status
+    cancelled = db.session.execute(
+        update(Job).where(Job.id == job.id, Job.status == QUEUED)
+        .values(status=CANCELLED, finished_at=datetime.utcnow())
+    ).rowcount == 1
+    if not cancelled:
+        db.session.execute(
+            update(Job).where(Job.id == job.id, Job.status == RUNNING).values(cancel_requested=True)
+        )
+    db.session.commit()
+    hook = _cancel_hooks.get(job.kind)
+    if cancelled and hook is not None:
+        hook(**json.loads(job.payload))
+
+
+def claim(job_id):
+    """
+    atomically move a queued job to running; False if another worker won
+    """
+    claimed = db.session.execute(
+        update(Job).where(Job.id == job_id, Job.status == QUEUED)
+        .values(status=RUNNING, started_at=datetime.utcnow(), heartbeat_at=datetime.utcnow(),
+                attempts=Job.attempts + 1)
+    ).rowcount == 1
+    db.session.commit()
+    return claimed
+
+
+def claim_next():
+    """
+    claim the highest priority job that is due; returns its id or None
+    """
+    while True:
+        job_id = db.session.query(Job.id).filter(
+            Job.status == QUEUED, Job.run_after <= datetime.utcnow()
+        ).order_by(Job.priority.desc(), Job.id).limit(1).scalar()
+        db.session.rollback()
+        if job_id is None:
+            return None
+        if claim(job_id):
+            return job_id
+
+
+def execute(job_id):
+    """
+    run a claimed job and record how it ended
+    """
+    job = db.session.get(Job, job_id)
+    handler = _handlers.get(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f'No handler for job kind {job.kind!r}.')
+        result = handler(JobContext(job), **json.loads(job.payload))
+    except JobCancelled:
+        db.session.rollback()
+        job.status = CANCELLED
+    except JobFailed as e:
+        db.session.rollback()
+        job.status = FAILED
+        job.error = str(e)
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Job %s (%s) failed', job.id, job.kind)
+        job.error = str(e)
+        if job.attempts < job.max_attempts and handler is not None:
+            job.status = QUEUED
+            job.run_after = datetime.utcnow() + timedelta(
+                seconds=current_app.config['JOBS_RETRY_DELAY'] * 2 ** (job.attempts - 1))
+        else:
+            job.status = FAILED
+    else:
+        job.status = SUCCEEDED
+        job.result = json.dumps(result)
+        job.error = None
+    if job.status in FINISHED:
+        job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def requeue_stale():
+    """
+    put jobs whose worker died back in the queue; returns how many
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['JOBS_STALE_AFTER'])
+    count = db.session.execute(
+        update(Job).where(Job.status == RUNNING,
+                          func.coalesce(Job.heartbeat_at, Job.started_at) < cutoff)
+        .values(status=QUEUED, run_after=datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    return count
+
+
+class WorkerPool:
+    """
+    threads pulling jobs off the queue until stopped; one of them requeues
+    stale jobs every `requeue_interval` seconds (a quarter of
+    `JOBS_STALE_AFTER` by default)
+    """
+
+    def __init__(self, workers, poll_interval=None, requeue_interval=None):
+        self.workers = workers
+        self.poll_interval = poll_interval or app.config['JOBS_POLL_INTERVAL']
+        self.requeue_interval = requeue_interval or app.config['JOBS_STALE_AFTER'] / 4
+        self.stopping = Event()
+        self.threads = []
+        self._next_requeue = 0.0
+        self._requeue_lock = Lock()
+
+    def _requeue_if_due(self):
+        with self._requeue_lock:
+            if time.monotonic() < self._next_requeue:
+                return
+            self._next_requeue = time.monotonic() + self.requeue_interval
+        count = requeue_stale()
+        if count:
+            logger.warning('Requeued %d stale jobs', count)
+
+    def _work(self):
+        while not self.stopping.is_set():
+            with app.app_context():
+                try:
+                    self._requeue_if_due()
+                    job_id = claim_next()
+                    if job_id is not None:
+                        execute(job_id)
+                        continue
+                except Exception:
+                    logger.exception('Job worker error')
+                    db.session.rollback()
+            self.stopping.wait(self.poll_interval)
+
+    def start(self):
+        for i in range(self.workers):
+            thread = Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        self.stopping.set()
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def wait(self):
+        """
+        block until interrupted
+        """
+        try:
+            while not self.stopping.wait(1):
+                pass
+        except KeyboardInterrupt:
+            self.stop()
+
+
+def start_embedded_workers():
+    """
+    start the in-process worker pool once
+    """
+    global _embedded_pool
+    with _embedded_lock:
+        if _embedded_pool is None:
+            _embedded_pool = WorkerPool(app.config['JOBS_EMBEDDED_WORKERS']).start()
+    return _embedded_pool
+
+
+def run_worker_process(workers):
+    """
+    entry point of a `flask jobs-work --processes` child
+    """
+    WorkerPool(workers).start().wait()
@@ -0,0 +1,374 @@
+"""
+Local load generator.
+
+Seeds the configured database with learners, decks and cards, then runs a pool
+of simulated learners against the real application, either in process through
+the Flask test client or over HTTP against a local server (one started in a
+background thread, or an already running one given by URL). Each learner logs in
+through the login form and then keeps picking weighted actions: open a deck,
+review due cards, search, export and look at the leaderboard, pausing for an
+exponentially distributed think time between requests.
+
+The report lists throughput, p50/p95/p99 latency and errors per endpoint, and,
+when the database is reachable in process, the time spent in SQL together with
+lock errors and writes slow enough to have waited for a lock. Everything runs
+offline on one machine; point `DATABASE_URL` at a scratch database first.
+
+    DATABASE_URL=sqlite:////tmp/load.db flask loadtest --seed --learners 20 --duration 60
+"""
+import http.cookiejar
+import random
+import re
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from threading import Event, Lock, Thread
+
+from sqlalchemy import event, select
+from werkzeug.serving import make_server
+
+from app import app, db, ph
+from app.models import User, Deck, DeckStats, Flashcard, Leaderboard
+
+LEARNER_PREFIX = 'loadtest'
+LEARNER_PASSWORD = 'loadtest'
+SEARCH_TERMS = ['capital', 'what', 'define', 'year', 'formula']
+SLOW_WRITE_SECONDS = 0.1
+
+ACTIONS = (
+    ('view_deck', 25),
+    ('review', 40),
+    ('search', 15),
+    ('leaderboard', 10),
+    ('export', 10),
+)
+
+CSRF_TOKEN = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"')
+
+
+def seed(learners, decks_per_learner=2, cards_per_deck=200):
+    """
+    create learners with decks of partly due cards; returns the number created
+    """
+    existing = db.session.execute(
+        select(User.id).where(User.username.like(f'{LEARNER_PREFIX}%'))
+    ).all()
+    start = len(existing)
+    if start >= learners:
+        return 0
+
+    password_hash = ph.hash(LEARNER_PASSWORD)
+    now = datetime.utcnow()
+    for i in range(start, learners):
+        user = User(username=f'{LEARNER_PREFIX}{i}', email=f'{LEARNER_PREFIX}{i}@example.com',
+                    password_hash=password_hash)
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Leaderboard(user_id=user.id, score=0))
+        for d in range(decks_per_learner):
+            deck = Deck(title=f'Load deck {d}', description='Generated by flask loadtest',
+                        user_id=user.id)
+            db.session.add(deck)
+            db.session.flush()
+            cards = [
+                {
+                    'question': f'What is the capital of place {i}-{d}-{c}?',
+                    'answer': f'Capital {c}',
+                    'deck_id': deck.id,
+                    'content_hash': Flashcard.compute_content_hash(
+                        f'What is the capital of place {i}-{d}-{c}?'),
+                    'next_review': now + timedelta(days=random.randint(-5, 30)),
+                }
+                for c in range(cards_per_deck)
+            ]
+            db.session.execute(Flashcard.__table__.insert(), cards)
+            DeckStats.apply(db.session.connection(), deck.id, *DeckStats.totals(cards))
+        db.session.commit()
+    return learners - start
+
+
+class TestClientTransport:
+    """
+    requests through the in-process Flask test client
+    """
+
+    def __init__(self):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        body = response.get_data()
+        response.close()
+        return response.status_code, body
+
+
+class HttpTransport:
+    """
+    requests over HTTP, keeping cookies like a browser
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+            _NoRedirect
+        )
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        req = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with self.opener.open(req) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as error:
+            return error.code, error.read()
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Stats:
+    """
+    thread safe latency and error bookkeeping
+    """
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.sql_seconds = 0.0
+        self.sql_statements = 0
+        self.lock_errors = 0
+        self.slow_writes = 0
+        self._lock = Lock()
+
+    def record(self, name, seconds, failed):
+        with self._lock:
+            self.latencies[name].append(seconds)
+            if failed:
+                self.errors[name] += 1
+
+    def record_sql(self, statement, seconds):
+        with self._lock:
+            self.sql_statements += 1
+            self.sql_seconds += seconds
+            if seconds >= SLOW_WRITE_SECONDS and not statement.lstrip().upper().startswith('SELECT'):
+                self.slow_writes += 1
+
+    def record_sql_error(self, error):
+        if 'locked' in str(error) or 'deadlock' in str(error).lower():
+            with self._lock:
+                self.lock_errors += 1
+
+
+class Learner:
+    """
+    one simulated learner working through their decks
+    """
+
+    def __init__(self, transport, index, deck_ids, stats, think_time):
+        self.transport = transport
+        self.index = index
+        self.deck_ids = deck_ids
+        self.stats = stats
+        self.think_time = think_time
+        self.random = random.Random(index)
+
+    def call(self, name, method, path, data=None):
+        started = time.perf_counter()
+        try:
+            status, body = self.transport.request(method, path, data)
+        except Exception:
+            status, body = 599, b''
+        self.stats.record(name, time.perf_counter() - started, status >= 400)
+        return status, body
+
+    def login(self):
+        _, body = self.call('login_form', 'GET', '/login')
+        match = CSRF_TOKEN.search(body.decode('utf-8', 'replace'))
+        status, _ = self.call('login', 'POST', '/login', {
+            'csrf_token': match.group(1) if match else '',
+            'email': f'{LEARNER_PREFIX}{self.index}@example.com',
+            'password': LEARNER_PASSWORD,
+        })
+        return status == 302
+
+    def act(self):
+        action = self.random.choices([name for name, _ in ACTIONS],
+                                     [weight for _, weight in ACTIONS])[0]
+        deck_id = self.random.choice(self.deck_ids)
+        if action == 'view_deck':
+            self.call('view_deck', 'GET', f'/deck/{deck_id}')
+        elif action == 'review':
+            status, _ = self.call('review_form', 'GET', f'/deck/{deck_id}/review')
+            if status == 200:
+                self.call('review', 'POST', f'/deck/{deck_id}/review',
+                          {'difficulty': str(self.random.choice([1, 2, 2, 3, 3, 3]))})
+        elif action == 'search':
+            self.call('search', 'GET', f'/search?query={self.random.choice(SEARCH_TERMS)}')
+        elif action == 'leaderboard':
+            self.call('leaderboard', 'GET', '/leaderboard')
+        else:
+            kind = self.random.choice(['json', 'csv', 'package'])
+            self.call(f'export_{kind}', 'GET', f'/deck/{deck_id}/export/{kind}')
+
+    def run(self, stop, iterations=None):
+        if not self.login():
+            return
+        done = 0
+        while not stop.is_set() and (iterations is None or done < iterations):
+            self.act()
+            done += 1
+            if self.think_time:
+                stop.wait(self.random.expovariate(1 / self.think_time))
+
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _watch_database(stats):
+    """
+    hook SQL timing and lock error counting onto the engine; returns an undo
+    """
+    engine = db.engine
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('loadtest_started', []).append(time.perf_counter())
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        stats.record_sql(statement, time.perf_counter() - conn.info['loadtest_started'].pop())
+
+    def error(context):
+        stats.record_sql_error(context.original_exception)
+        started = context.connection.info.get('loadtest_started') if context.connection else None
+        if started:
+            started.pop()
+
+    event.listen(engine, 'before_cursor_execute', before)
+    event.listen(engine, 'after_cursor_execute', after)
+    event.listen(engine, 'handle_error', error)
+
+    def undo():
+        event.remove(engine, 'before_cursor_execute', before)
+        event.remove(engine, 'after_cursor_execute', after)
+        event.remove(engine, 'handle_error', error)
+    return undo
+
+
+def run(learners, duration=None, iterations=None, think_time=0.5, mode='client', url=None):
+    """
+    drive the app with simulated learners; returns the report as a dict
+
+    `mode` is `client` (in-process test client), `server` (a local server in a
+    background thread) or `url` (an already running server at `url`).
+    """
+    with app.app_context():
+        decks = db.session.execute(
+            select(User.username, Deck.id).join(Deck, Deck.user_id == User.id)
+            .where(User.username.like(f'{LEARNER_PREFIX}%'))
+        ).all()
+    deck_ids = defaultdict(list)
+    for username, deck_id in decks:
+        deck_ids[int(username[len(LEARNER_PREFIX):])].append(deck_id)
+    learner_ids = sorted(deck_ids)[:learners]
+    if not learner_ids:
+        raise RuntimeError('No load test learners found, seed the database first.')
+
+    stats = Stats()
+    server = None
+    undo = None
+    if mode == 'server':
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_port}'
+    if mode != 'url':
+        with app.app_context():
+            undo = _watch_database(stats)
+
+    stop = Event()
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=len(learner_ids)) as pool:
+            futures = []
+            for index in learner_ids:
+                transport = TestClientTransport() if mode == 'client' else HttpTransport(url)
+                learner = Learner(transport, index, deck_ids[index], stats, think_time)
+                futures.append(pool.submit(learner.run, stop, iterations))
+            if duration is not None:
+                stop.wait(duration)
+                stop.set()
+            for future in futures:
+                future.result()
+    finally:
+        stop.set()
+        elapsed = time.perf_counter() - started
+        if undo is not None:
+            undo()
+        if server is not None:
+            server.shutdown()
+
+    return report(stats, elapsed, in_process=mode != 'url')
+
+
+def report(stats, elapsed, in_process=True):
+    """
+    summarize the collected measurements
+    """
+    endpoints = {}
+    for name, values in sorted(stats.latencies.items()):
+        values = sorted(values)
+        endpoints[name] = {
+            'requests': len(values),
+            'errors': stats.errors[name],
+            'rps': len(values) / elapsed if elapsed else 0.0,
+            'p50': _percentile(values, 0.50),
+            'p95': _percentile(values, 0.95),
+            'p99': _percentile(values, 0.99),
+        }
+    total = sum(endpoint['requests'] for endpoint in endpoints.values())
+    result = {
+        'elapsed': elapsed,
+        'requests': total,
+        'errors': sum(stats.errors.values()),
+        'rps': total / elapsed if elapsed else 0.0,
+        'endpoints': endpoints,
+    }
+    if in_process:
+        result['database'] = {
+            'statements': stats.sql_statements,
+            'seconds': stats.sql_seconds,
+            'lock_errors': stats.lock_errors,
+            'slow_writes': stats.slow_writes,
+        }
+    return result
+
+
+def format_report(result):
+    """
+    render a report as a plain text table
+    """
+    lines = [
+        f'{"endpoint":<16}{"requests":>10}{"errors":>8}{"req/s":>9}'
+        f'{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}',
+    ]
+    for name, endpoint in result['endpoints'].items():
+        lines.append(
+            f'{name:<16}{endpoint["requests"]:>10}{endpoint["errors"]:>8}{endpoint["rps"]:>9.1f}'
+            f'{endpoint["p50"] * 1000:>9.1f}{endpoint["p95"] * 1000:>9.1f}{endpoint["p99"] * 1000:>9.1f}'
+        )
+    error_rate = result['errors'] / result['requests'] if result['requests'] else 0.0
+    lines.append(f'{result["requests"]} requests in {result["elapsed"]:.1f}s, '
+                 f'{result["rps"]:.1f} req/s, {error_rate:.2%} errors')
+    database = result.get('database')
+    if database:
+        lines.append(f'database: {database["statements"]} statements, '
+                     f'{database["seconds"]:.1f}s in SQL, {database["lock_errors"]} lock errors, '
+                     f'{database["slow_writes"]} writes over {SLOW_WRITE_SECONDS * 1000:.0f} ms')
+    return '\n'.join(lines)
@@ -0,0 +1,326 @@
+"""
+Retention and compaction of ever-growing tables.
+
+`flask maintenance` (from cron, or with `--loop`) runs four jobs:
+
+    - `archive_notifications`: moves read notifications older than the retention
+      window into `notification_archive`;
+    - `compact_progress`: folds old `Progress` rows into one row per user, deck
+      and bucket (a week by default);
+    - `reconcile_deck_stats`: recounts `DeckStats` from the cards and repairs
+      any drift left by writes that bypassed it;
+    - `optimize_database`: incremental VACUUM and ANALYZE (SQLite) or ANALYZE
+      (PostgreSQL).
+
+The first three work in small batches, each committed on its own so no write lock
+is held for long, and record their position in `MaintenanceCheckpoint` within
+the same transaction. A run that hits its time budget or is interrupted picks up
+where it stopped; `compact_progress` instead records the cutoff of its last
+finished run, so each run only reads the buckets that aged past it since. A
+`Budget` caps the rows processed per second so maintenance never starves the
+web workers.
+
+SQLite files only support the incremental VACUUM once they were switched to
+`auto_vacuum=INCREMENTAL`, which takes one full VACUUM: run
+`flask maintenance --enable-incremental-vacuum` once. Until then the step is
+skipped with a warning.
+"""
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import case, delete, func, insert, select, text, tuple_, update
+
+from app import db
+from app.jobs import job_handler
+from app.models import (Deck, DeckStats, Flashcard, Notification, NotificationArchive, Progress,
+                        MaintenanceCheckpoint)
+
+logger = logging.getLogger(__name__)
+
+# a Monday, so weekly buckets start on Mondays
+BUCKET_ORIGIN = datetime(1970, 1, 5)
+# value of `PRAGMA auto_vacuum` for INCREMENTAL
+INCREMENTAL_VACUUM = 2
+
+
+class Budget:
+    """
+    rows per second cap and overall deadline shared by the jobs of one run
+    """
+
+    def __init__(self, max_rows_per_second=None, max_seconds=None):
+        self.max_rows_per_second = max_rows_per_second
+        self.deadline = time.monotonic() + max_seconds if max_seconds else None
+        self.started = time.monotonic()
+        self.rows = 0
+
+    def spend(self, rows):
+        """
+        account for processed rows, sleeping if they came too fast
+        """
+        self.rows += rows
+        if self.max_rows_per_second:
+            ahead = self.rows / self.max_rows_per_second - (time.monotonic() - self.started)
+            if ahead > 0:
+                time.sleep(ahead)
+
+    @property
+    def exhausted(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+
+def _checkpoint(job):
+    checkpoint = db.session.get(MaintenanceCheckpoint, job)
+    if checkpoint is None:
+        checkpoint = MaintenanceCheckpoint(job=job, position=0)
+        db.session.add(checkpoint)
+    return checkpoint
+
+
+def archive_notifications(budget, retention_days=None, batch_size=None, now=None):
+    """
+    move read notifications older than the retention window to the archive;
+    returns the number moved
+    """
+    retention_days = retention_days or current_app.config['MAINTENANCE_NOTIFICATION_RETENTION_DAYS']
+    batch_size = batch_size or current_app.config['MAINTENANCE_BATCH_SIZE']
+    cutoff = (now or datetime.utcnow()) - timedelta(days=retention_days)
+    checkpoint = _checkpoint('archive_notifications')
+    archived = 0
+
+    while not budget.exhausted:
+        ids = db.session.execute(
+            select(Notification.id).where(
+                Notification.id > checkpoint.position,
+                Notification.is_read.is_(True),
+                Notification.timestamp < cutoff
+            ).order_by(Notification.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            checkpoint.position = 0
+            db.session.commit()
+            break
+        db.session.execute(
+            insert(NotificationArchive).from_select(
+                ['notification_id', 'user_id', 'message', 'is_read', 'timestamp'],
+                select(Notification.id, Notification.user_id, Notification.message,
+                       Notification.is_read, Notification.timestamp)
+                .where(Notification.id.in_(ids))
+            )
+        )
+        db.session.execute(delete(Notification).where(Notification.id.in_(ids)))
+        checkpoint.position = ids[-1]
+        db.session.commit()
+        archived += len(ids)
+        budget.spend(len(ids))
+    return archived
+
+
+def _bucket_start(moment, bucket_days):
+    days = (moment - BUCKET_ORIGIN).days // bucket_days * bucket_days
+    return BUCKET_ORIGIN + timedelta(days=days)
+
+
+def compact_progress(budget, older_than_days=None, bucket_days=None, batch_size=None, now=None):
+    """
+    fold old progress rows into one row per user, deck and bucket, at most
+    `batch_size` rows at a time; returns the number of rows removed
+    """
+    older_than_days = older_than_days or current_app.config['MAINTENANCE_PROGRESS_COMPACT_AFTER_DAYS']
+    bucket_days = bucket_days or current_app.config['MAINTENANCE_PROGRESS_BUCKET_DAYS']
+    batch_size = batch_size or current_app.config['MAINTENANCE_BATCH_SIZE']
+    # only whole buckets are compacted, so a bucket is never folded twice
+    cutoff = _bucket_start((now or datetime.utcnow()) - timedelta(days=older_than_days), bucket_days)
+    # the checkpoint is the cutoff of the last finished run, in days since the
+    # origin; everything before it is compacted already
+    checkpoint = _checkpoint('compact_progress')
+    floor = BUCKET_ORIGIN + timedelta(days=checkpoint.position)
+    after = None
+    removed = 0
+
+    while not budget.exhausted:
+        statement = (
+            select(Progress.id, Progress.user_id, Progress.deck_id,
+                   Progress.cards_reviewed, Progress.date)
+            .where(Progress.date >= floor, Progress.date < cutoff)
+            .order_by(Progress.user_id, Progress.date, Progress.id).limit(batch_size)
+        )
+        if after is not None:
+            statement = statement.where(tuple_(Progress.user_id, Progress.date, Progress.id) > after)
+        rows = db.session.execute(statement).all()
+        if not rows:
+            checkpoint.position = max(checkpoint.position, (cutoff - BUCKET_ORIGIN).days)
+            db.session.commit()
+            break
+
+        # leave a user's bucket cut off by the limit to the next batch, unless
+        # it fills the whole batch
+        if len(rows) == batch_size:
+            last = (rows[-1].user_id, _bucket_start(rows[-1].date, bucket_days))
+            whole = [row for row in rows
+                     if (row.user_id, _bucket_start(row.date, bucket_days)) != last]
+            rows = whole or rows
+        after = (rows[-1].user_id, rows[-1].date, rows[-1].id)
+
+        buckets = defaultdict(list)
+        for row in rows:
+            buckets[(row.user_id, row.deck_id, _bucket_start(row.date, bucket_days))].append(row)
+
+        stale_ids = []
+        compacted = []
+        for (user_id, deck_id, start), group in buckets.items():
+            if len(group) == 1 and group[0].date == start:
+                continue
+            stale_ids.extend(row.id for row in group)
+            compacted.append({
+                'user_id': user_id,
+                'deck_id': deck_id,
+                'date': start,
+                'cards_reviewed': sum(row.cards_reviewed or 0 for row in group),
+            })
+        if stale_ids:
+            db.session.execute(delete(Progress).where(Progress.id.in_(stale_ids)))
+            db.session.execute(insert(Progress), compacted)
+        db.session.commit()
+        removed += len(stale_ids) - len(compacted)
+        budget.spend(len(rows))
+    return removed
+
+
+def reconcile_deck_stats(budget, batch_size=None):
+    """
+    recount the statistics of a batch of decks at a time and fix the ones that
+    drifted; returns the number of decks repaired
+    """
+    batch_size = batch_size or current_app.config['MAINTENANCE_BATCH_SIZE']
+    checkpoint = _checkpoint('reconcile_deck_stats')
+    repaired = 0
+
+    while not budget.exhausted:
+        deck_ids = db.session.execute(
+            select(Deck.id).where(Deck.id > checkpoint.position).order_by(Deck.id).limit(batch_size)
+        ).scalars().all()
+        if not deck_ids:
+            checkpoint.position = 0
+            db.session.commit()
+            break
+
+        mastered = case((Flashcard.interval >= DeckStats.MASTERED_INTERVAL, 1), else_=0)
+        actual = {row[0]: tuple(row[1:]) for row in db.session.execute(
+            select(Flashcard.deck_id, func.count(), func.sum(func.coalesce(Flashcard.ease_factor, 2.5)),
+                   func.sum(mastered))
+            .where(Flashcard.deck_id.in_(deck_ids)).group_by(Flashcard.deck_id)
+        )}
+        stored = {row[0]: tuple(row[1:]) for row in db.session.execute(
+            select(DeckStats.deck_id, DeckStats.card_count, DeckStats.ease_sum, DeckStats.mastered_count)
+            .where(DeckStats.deck_id.in_(deck_ids))
+        )}
+
+        fixes, missing = [], []
+        for deck_id in deck_ids:
+            card_count, ease_sum, mastered_count = actual.get(deck_id, (0, 0.0, 0))
+            values = {'deck_id': deck_id, 'card_count': card_count, 'ease_sum': ease_sum,
+                      'mastered_count': mastered_count}
+            if deck_id not in stored:
+                missing.append(values)
+                continue
+            stored_count, stored_ease, stored_mastered = stored[deck_id]
+            # the ease sum is a float accumulated one card at a time
+            if (stored_count, stored_mastered) != (card_count, mastered_count) or \
+                    abs(stored_ease - ease_sum) > 1e-6:
+                fixes.append(values)
+        if missing:
+            db.session.execute(insert(DeckStats), missing)
+        if fixes:
+            db.session.execute(update(DeckStats), fixes)
+        checkpoint.position = deck_ids[-1]
+        db.session.commit()
+        repaired += len(fixes) + len(missing)
+        budget.spend(len(deck_ids))
+    return repaired
+
+
+@job_handler('reconcile_deck_stats')
+def reconcile_deck_stats_job(context):
+    """
+    `reconcile_deck_stats` as a background job
+    """
+    return {'decks_repaired': reconcile_deck_stats(Budget())}
+
+
+def _auto_vacuum(connection):
+    """
+    the auto-vacuum mode of an SQLite database, as last written by any connection
+    """
+    # the pragma answers from the header the connection read last; a read
+    # refreshes it when another connection changed the mode
+    connection.exec_driver_sql('SELECT count(*) FROM sqlite_master').scalar()
+    return connection.exec_driver_sql('PRAGMA auto_vacuum').scalar()
+
+
+def enable_incremental_vacuum():
+    """
+    switch an SQLite database to incremental auto-vacuum, rewriting it once
+    with a full VACUUM; returns whether it was switched
+    """
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return False
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        if _auto_vacuum(connection) == INCREMENTAL_VACUUM:
+            return False
+        connection.exec_driver_sql('PRAGMA auto_vacuum = INCREMENTAL')
+        connection.exec_driver_sql('VACUUM')
+    return True
+
+
+def optimize_database(vacuum_pages=None):
+    """
+    give freed pages back and refresh planner statistics; returns whether
+    pages were vacuumed
+    """
+    vacuum_pages = vacuum_pages or current_app.config['MAINTENANCE_VACUUM_PAGES']
+    engine = db.engine
+    vacuumed = False
+    if engine.dialect.name == 'sqlite':
+        with engine.connect() as connection:
+            if _auto_vacuum(connection) == INCREMENTAL_VACUUM:
+                # the pragma frees one page per step and `execute` only steps
+                # once; `executescript` runs it to the end
+                connection.connection.executescript(f'PRAGMA incremental_vacuum({int(vacuum_pages)})')
+                vacuumed = True
+            else:
+                logger.warning('Skipped VACUUM: the database is not in incremental auto-vacuum mode; '
+                               'run `flask maintenance --enable-incremental-vacuum` once.')
+            connection.exec_driver_sql('PRAGMA optimize')
+            connection.commit()
+    elif engine.dialect.name == 'postgresql':
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            for table in (Notification.__tablename__, Progress.__tablename__):
+                connection.execute(text(f'VACUUM (ANALYZE) "{table}"'))
+        vacuumed = True
+    else:
+        with engine.connect() as connection:
+            connection.execute(text('ANALYZE'))
+            connection.commit()
+    return vacuumed
+
+
+def run_maintenance(max_rows_per_second=None, max_seconds=None):
+    """
+    run every maintenance job once within the given budget; returns a summary
+    """
+    if max_rows_per_second is None:
+        max_rows_per_second = current_app.config['MAINTENANCE_MAX_ROWS_PER_SECOND']
+    budget = Budget(max_rows_per_second, max_seconds)
+    summary = {
+        'notifications_archived': archive_notifications(budget),
+        'progress_rows_removed': compact_progress(budget),
+        'deck_stats_repaired': reconcile_deck_stats(budget),
+    }
+    summary['vacuumed'] = optimize_database()
+    logger.info('Maintenance finished: %s', summary)
+    return summary
@@ -2,8 +2,13 @@
 Module for models
 """
 # pylint: disable=trailing-whitespace
+import hashlib
+import json
+import re
+import unicodedata
 from datetime import datetime, timedelta
 from flask_login import UserMixin
+from sqlalchemy import event, inspect
 from argon2 import PasswordHasher
 from app import db
 from app import login_manager
@@ -22,6 +27,7 @@ class User(db.Model, UserMixin):
     decks = db.relationship('Deck', backref='author', lazy=True)
     notifications = db.relationship('Notification', backref='user', lazy=True)
     streak = db.relationship('Streak', backref='user', uselist=False, lazy=True)
+    reminder = db.relationship('Reminder', backref='user', uselist=False, lazy=True)
 
     @property
     def password(self):
@@ -60,9 +66,28 @@ class Deck(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # the deck this one was cloned from
+    source_deck_id = db.Column(db.Integer, db.ForeignKey('deck.id'), nullable=True)
     flashcards = db.relationship('Flashcard', backref='deck', lazy=True)
 
+    __table_args__ = (
+        # one copy of a deck per user
+        db.Index('ix_deck_source_deck_id_user_id', 'source_deck_id', 'user_id', unique=True),
+    )
+
+    @staticmethod
+    def bump_version(connection, deck_id):
+        """
+        mark the deck's cards as changed, invalidating cached renderings of them
+        """
+        connection.execute(
+            Deck.__table__.update()
+            .where(Deck.__table__.c.id == deck_id)
+            .values(version=Deck.__table__.c.version + 1)
+        )
+
 class Flashcard(db.Model):
     """
     Flashcard Module
@@ -72,10 +97,34 @@ class Flashcard(db.Model):
     answer = db.Column(db.Text, nullable=False)
     difficulty = db.Column(db.Integer, default=1)
     next_review = db.Column(db.DateTime, default=datetime.utcnow)
-    interval = db.Column(db.Integer, default=1)
+    # old values of the columns behind DeckStats are needed for its deltas
+    interval = db.column_property(db.Column(db.Integer, default=1), active_history=True)
     repetitions = db.Column(db.Integer, default=0)
-    ease_factor = db.Column(db.Float, default=2.5)
-    deck_id = db.Column(db.Integer, db.ForeignKey('deck.id'), nullable=False)
+    ease_factor = db.column_property(db.Column(db.Float, default=2.5), active_history=True)
+    # deck_id lookups use the leading column of the composite indexes below
+    deck_id = db.column_property(db.Column(db.Integer, db.ForeignKey('deck.id'), nullable=False),
+                                 active_history=True)
+    content_hash = db.Column(db.String(40), nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_flashcard_deck_id_next_review', 'deck_id', 'next_review'),
+        db.Index('ix_flashcard_deck_id_content_hash', 'deck_id', 'content_hash'),
+    )
+
+    @staticmethod
+    def compute_content_hash(question):
+        """
+        hash identifying a card within its deck
+
+        Only the question is hashed: two cards asking the same thing are
+        duplicates whatever their answers, which is what lets imports update or
+        merge answers. The question is normalized (unicode form, case and
+        whitespace) first, so re-imports of the same card hash the same even if
+        reformatted.
+        """
+        normalized = unicodedata.normalize('NFKC', question or '').casefold()
+        normalized = re.sub(r'\s+', ' ', normalized).strip()
+        return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
 
     def update_review(self, difficulty):
         """
@@ -99,6 +148,112 @@ class Flashcard(db.Model):
         self.next_review = datetime.utcnow() + timedelta(days=self.interval)
         db.session.commit()
 
+@event.listens_for(Flashcard, 'before_insert')
+def set_content_hash(mapper, connection, target):
+    """
+    hash new cards
+    """
+    target.content_hash = Flashcard.compute_content_hash(target.question)
+
+@event.listens_for(Flashcard, 'before_update')
+def refresh_content_hash(mapper, connection, target):
+    """
+    rehash cards whose question was edited
+    """
+    if inspect(target).attrs.question.history.has_changes():
+        target.content_hash = Flashcard.compute_content_hash(target.question)
+
+@event.listens_for(Flashcard, 'after_insert')
+def flashcard_added(mapper, connection, target):
+    """
+    new cards change the deck and its statistics
+    """
+    Deck.bump_version(connection, target.deck_id)
+    DeckStats.apply(connection, target.deck_id, *DeckStats.totals([target]))
+
+@event.listens_for(Flashcard, 'after_delete')
+def flashcard_removed(mapper, connection, target):
+    """
+    removed cards change the deck and its statistics
+    """
+    Deck.bump_version(connection, target.deck_id)
+    cards, ease, mastered = DeckStats.totals([target])
+    DeckStats.apply(connection, target.deck_id, -cards, -ease, -mastered)
+
+def _previous(state, name):
+    history = state.attrs[name].history
+    return history.deleted[0] if history.deleted else getattr(state.object, name)
+
+@event.listens_for(Flashcard, 'after_update')
+def flashcard_edited(mapper, connection, target):
+    """
+    edited cards change the deck, reviews only its statistics
+    """
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in ('question', 'answer', 'deck_id')):
+        Deck.bump_version(connection, target.deck_id)
+    if any(state.attrs[name].history.has_changes() for name in ('ease_factor', 'interval', 'deck_id')):
+        old_deck_id = _previous(state, 'deck_id')
+        old_ease = _previous(state, 'ease_factor')
+        old_mastered = DeckStats.is_mastered(_previous(state, 'interval'))
+        DeckStats.apply(connection, old_deck_id, -1, -(old_ease or 0.0), -old_mastered)
+        DeckStats.apply(connection, target.deck_id, *DeckStats.totals([target]))
+
+class DeckStats(db.Model):
+    """
+    DeckStats Module
+
+    Running totals of a deck's cards kept up to date on every write, so listings
+    never aggregate `Flashcard`. ORM writes are tracked by the Flashcard events;
+    bulk writes call `apply` themselves. `reconcile_deck_stats` repairs drift.
+    """
+    __tablename__ = 'deck_stats'
+    # cards reviewed at this interval (days) or longer count as mastered
+    MASTERED_INTERVAL = 21
+
+    deck_id = db.Column(db.Integer, db.ForeignKey('deck.id'), primary_key=True)
+    card_count = db.Column(db.Integer, nullable=False, default=0)
+    ease_sum = db.Column(db.Float, nullable=False, default=0.0)
+    mastered_count = db.Column(db.Integer, nullable=False, default=0)
+
+    @staticmethod
+    def is_mastered(interval):
+        return int((interval or 0) >= DeckStats.MASTERED_INTERVAL)
+
+    @staticmethod
+    def totals(cards):
+        """
+        card count, ease sum and mastered count of cards (models or dicts)
+        """
+        cards = [card if isinstance(card, dict) else {
+            'ease_factor': card.ease_factor, 'interval': card.interval} for card in cards]
+        return (len(cards),
+                sum(2.5 if card.get('ease_factor') is None else card['ease_factor'] for card in cards),
+                sum(DeckStats.is_mastered(card.get('interval')) for card in cards))
+
+    @staticmethod
+    def apply(connection, deck_id, cards=0, ease=0.0, mastered=0):
+        """
+        add to the totals of a deck
+        """
+        table = DeckStats.__table__
+        updated = connection.execute(
+            table.update().where(table.c.deck_id == deck_id).values(
+                card_count=table.c.card_count + cards,
+                ease_sum=table.c.ease_sum + ease,
+                mastered_count=table.c.mastered_count + mastered)
+        ).rowcount
+        if not updated:
+            connection.execute(table.insert().values(
+                deck_id=deck_id, card_count=cards, ease_sum=ease, mastered_count=mastered))
+
+@event.listens_for(Deck, 'after_insert')
+def deck_created(mapper, connection, target):
+    """
+    every deck starts with empty statistics
+    """
+    DeckStats.apply(connection, target.id)
+
 class Progress(db.Model):
     """
     Progress Module
@@ -109,6 +264,10 @@ class Progress(db.Model):
     cards_reviewed = db.Column(db.Integer, default=0)
     date = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_progress_user_id_date', 'user_id', 'date'),
+    )
+
 class Notification(db.Model):
     """
     Notification Module
@@ -119,12 +278,32 @@ class Notification(db.Model):
     is_read = db.Column(db.Boolean, default=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_notification_user_id_timestamp', 'user_id', 'timestamp'),
+    )
+
+class NotificationArchive(db.Model):
+    """
+    NotificationArchive Module
+
+    Read notifications moved out of `notification` by the retention job. SQLite
+    hands out the ids of deleted notifications again, so the archive keeps its
+    own key and the original id in `notification_id`.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    notification_id = db.Column(db.Integer, nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    message = db.Column(db.String(200), nullable=False)
+    is_read = db.Column(db.Boolean, default=True)
+    timestamp = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class Streak(db.Model):
     """
     Streak Module
     """
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     last_studied = db.Column(db.DateTime, default=datetime.utcnow)
     streak_count = db.Column(db.Integer, default=0)
 
@@ -133,6 +312,80 @@ class Leaderboard(db.Model):
     Leaderboard Module
     """
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    score = db.Column(db.Integer, default=0)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    score = db.Column(db.Integer, default=0, index=True)
     user = db.relationship('User', backref='leaderboard_entry')
+
+class Reminder(db.Model):
+    """
+    Reminder Module
+
+    `minute_of_day` is the UTC minute (0-1439) the user asked to be reminded at;
+    it is the bucket the dispatcher selects on every minute.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, unique=True)
+    minute_of_day = db.Column(db.Integer, nullable=False)
+    last_sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_reminder_minute_of_day_user_id', 'minute_of_day', 'user_id'),
+    )
+
+class MaintenanceCheckpoint(db.Model):
+    """
+    MaintenanceCheckpoint Module
+
+    Where a batched maintenance job stopped, so the next run resumes there.
+    """
+    job = db.Column(db.String(50), primary_key=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Job(db.Model):
+    """
+    Job Module
+
+    A unit of background work run by `app.jobs` workers. Higher `priority` runs
+    first; failed attempts are retried after `run_after` until `max_attempts`.
+    A running job refreshes `heartbeat_at` whenever it reports progress.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    priority = db.Column(db.Integer, nullable=False, default=0)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    result = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    progress_done = db.Column(db.Integer, nullable=False, default=0)
+    progress_total = db.Column(db.Integer, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True, index=True)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_job_status_priority_id', 'status', 'priority', 'id'),
+    )
+
+    def to_dict(self):
+        """
+        status as reported by the polling endpoint
+        """
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': {'done': self.progress_done, 'total': self.progress_total},
+            'attempts': self.attempts,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'cancel_requested': self.cancel_requested,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
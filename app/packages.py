@@ -0,0 +1,266 @@
+"""
+Binary deck packages.
+
+A compact, columnar alternative to the JSON and CSV exports that also carries
+the scheduling state of every card. A package is laid out as:
+
+    header   magic `FCDK`, format version (u8), codec (u8), reserved (u16),
+             metadata length (u32) and the metadata itself (JSON: title,
+             description)
+    blocks   compressed length (u32), raw length (u32), row count (u32) and the
+             compressed block; a block with compressed length 0 ends the package
+
+All integers are little-endian. A block holds up to `PACKAGE_BLOCK_SIZE` cards
+column by column: `next_review` (f8, seconds since the epoch, NaN when unset),
+`ease_factor` (f8), `interval`, `repetitions` and `difficulty` (i4 each), the
+question and answer lengths (u4 each), then the UTF-8 questions and answers back
+to back. Blocks are compressed with zstd when the optional `zstandard` package is
+installed and with zlib otherwise; the codec is recorded in the header.
+
+Exports are streamed straight from a database cursor one block at a time.
+Imports memory-map the package and read the numeric columns as memoryviews over
+the (decompressed) block without copying them.
+"""
+import json
+import math
+import mmap
+import struct
+import sys
+import weakref
+import zlib
+from array import array
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.models import Flashcard
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b'FCDK'
+FORMAT_VERSION = 1
+CODEC_NONE, CODEC_ZLIB, CODEC_ZSTD = 0, 1, 2
+
+HEADER = struct.Struct('<4sBBHI')
+BLOCK = struct.Struct('<III')
+
+EPOCH = datetime(1970, 1, 1)
+LITTLE_ENDIAN = sys.byteorder == 'little'
+
+_flashcard = Flashcard.__table__.c
+COLUMNS = (
+    _flashcard.question, _flashcard.answer, _flashcard.next_review, _flashcard.ease_factor,
+    _flashcard.interval, _flashcard.repetitions, _flashcard.difficulty,
+)
+
+
+class PackageError(ValueError):
+    """
+    raised for files that are not valid deck packages
+    """
+
+
+def default_codec():
+    return CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+
+
+def _compress(codec, data):
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, 6)
+    return data
+
+
+def _decompress(codec, data, raw_length):
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise PackageError('This package needs the zstandard package to be read.')
+        try:
+            block = zstandard.ZstdDecompressor().decompress(data, max_output_size=raw_length)
+        except zstandard.ZstdError as e:
+            raise PackageError(f'The package is corrupt: {e}') from e
+    elif codec == CODEC_ZLIB:
+        try:
+            block = zlib.decompress(data)
+        except zlib.error as e:
+            raise PackageError(f'The package is corrupt: {e}') from e
+    elif codec == CODEC_NONE:
+        block = data
+    else:
+        raise PackageError(f'Unknown package codec {codec}.')
+    # a block shorter than recorded would be read past its end
+    if len(block) != raw_length:
+        raise PackageError('The package is corrupt: a block has the wrong size.')
+    return block
+
+
+def _little_endian(values):
+    if not LITTLE_ENDIAN:
+        values.byteswap()
+    return values.tobytes()
+
+
+def _to_timestamp(moment):
+    return math.nan if moment is None else (moment - EPOCH).total_seconds()
+
+
+def _from_timestamp(seconds):
+    return None if math.isnan(seconds) else EPOCH + timedelta(seconds=seconds)
+
+
+def _encode_block(rows):
+    question, answer, next_review, ease_factor, interval, repetitions, difficulty = zip(*rows)
+    questions = [text.encode('utf-8') for text in question]
+    answers = [text.encode('utf-8') for text in answer]
+    columns = [
+        array('d', map(_to_timestamp, next_review)),
+        array('d', [2.5 if value is None else value for value in ease_factor]),
+        array('i', [value or 1 for value in interval]),
+        array('i', [value or 0 for value in repetitions]),
+        array('i', [value or 1 for value in difficulty]),
+        array('I', map(len, questions)),
+        array('I', map(len, answers)),
+    ]
+    return b''.join([_little_endian(column) for column in columns] +
+                    questions + answers)
+
+
+def write_package(deck, codec=None, block_size=None):
+    """
+    generate the package of a deck chunk by chunk, reading its cards with a
+    server-side cursor
+    """
+    codec = default_codec() if codec is None else codec
+    block_size = block_size or current_app.config['PACKAGE_BLOCK_SIZE']
+    meta = json.dumps({'title': deck.title, 'description': deck.description}).encode('utf-8')
+    yield HEADER.pack(MAGIC, FORMAT_VERSION, codec, 0, len(meta)) + meta
+
+    result = db.session.execute(
+        select(*COLUMNS).where(_flashcard.deck_id == deck.id).order_by(_flashcard.id),
+        execution_options={'yield_per': block_size}
+    )
+    for rows in result.partitions():
+        raw = _encode_block(rows)
+        data = _compress(codec, raw)
+        yield BLOCK.pack(len(data), len(raw), len(rows)) + data
+    yield BLOCK.pack(0, 0, 0)
+
+
+def _column(block, offset, typecode, count):
+    """
+    `count` values at `offset`, as a zero-copy view where the platform allows
+    """
+    size = array(typecode).itemsize * count
+    view = block[offset:offset + size]
+    if LITTLE_ENDIAN:
+        return view.cast(typecode), offset + size
+    values = array(typecode)
+    values.frombytes(view)
+    values.byteswap()
+    return values, offset + size
+
+
+def _decode_block(block, count):
+    block = memoryview(block)
+    offset = 0
+    next_review, offset = _column(block, offset, 'd', count)
+    ease_factor, offset = _column(block, offset, 'd', count)
+    interval, offset = _column(block, offset, 'i', count)
+    repetitions, offset = _column(block, offset, 'i', count)
+    difficulty, offset = _column(block, offset, 'i', count)
+    question_lengths, offset = _column(block, offset, 'I', count)
+    answer_lengths, offset = _column(block, offset, 'I', count)
+
+    questions = []
+    for length in question_lengths:
+        questions.append(str(block[offset:offset + length], 'utf-8'))
+        offset += length
+    for i, length in enumerate(answer_lengths):
+        yield {
+            'question': questions[i],
+            'answer': str(block[offset:offset + length], 'utf-8'),
+            'next_review': _from_timestamp(next_review[i]),
+            'ease_factor': ease_factor[i],
+            'interval': interval[i],
+            'repetitions': repetitions[i],
+            'difficulty': difficulty[i],
+        }
+        offset += length
+
+
+class PackageReader:
+    """
+    reads a deck package through a memory map
+
+        with PackageReader(path) as package:
+            package.meta['title']
+            for card in package.cards():
+                ...
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise PackageError('The package is empty.')
+        self._view = memoryview(self._map)
+        # open card generators hold views of the map until they are closed
+        self._readers = weakref.WeakSet()
+        if len(self._view) < HEADER.size:
+            self.close()
+            raise PackageError('The package is truncated.')
+        magic, version, self.codec, _, meta_length = HEADER.unpack_from(self._view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise PackageError('Not a deck package.')
+        start = HEADER.size
+        self.meta = json.loads(str(self._view[start:start + meta_length], 'utf-8'))
+        self._blocks_start = start + meta_length
+
+    def cards(self):
+        """
+        iterate over every card as a dict of Flashcard columns
+        """
+        reader = self._cards()
+        self._readers.add(reader)
+        return reader
+
+    def _cards(self):
+        offset = self._blocks_start
+        while True:
+            if offset + BLOCK.size > len(self._view):
+                raise PackageError('The package is truncated.')
+            length, raw_length, count = BLOCK.unpack_from(self._view, offset)
+            offset += BLOCK.size
+            if length == 0:
+                return
+            data = self._view[offset:offset + length]
+            try:
+                if len(data) != length:
+                    raise PackageError('The package is truncated.')
+                yield from _decode_block(_decompress(self.codec, data, raw_length), count)
+            finally:
+                data.release()
+            offset += length
+
+    def close(self):
+        # a reader abandoned halfway still holds a block view; close it first
+        for reader in list(self._readers):
+            reader.close()
+        self._view.release()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
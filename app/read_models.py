@@ -0,0 +1,137 @@
+"""
+Read models for listing pages and exports.
+
+Listings only show a few columns of many rows, so instead of loading full ORM
+instances (identity map, change tracking, every column) they select just the
+columns they render from the tables and return them as namedtuples. The rows
+keep the attribute names of the models, so templates work with either.
+
+Rows are read-only snapshots; anything that modifies data still loads models.
+
+Deck summaries read the running totals kept in `DeckStats`; only the due count,
+which changes with the clock, is counted, through the `(deck_id, next_review)`
+index.
+"""
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from app import db
+from app.models import Deck, DeckStats, Flashcard, Progress, Notification
+
+DeckRow = namedtuple('DeckRow', ['id', 'title', 'description'])
+FlashcardRow = namedtuple('FlashcardRow', ['id', 'question', 'answer'])
+QuestionRow = namedtuple('QuestionRow', ['id', 'question'])
+ProgressRow = namedtuple('ProgressRow', ['date', 'cards_reviewed'])
+NotificationRow = namedtuple('NotificationRow', ['id', 'message', 'is_read', 'timestamp'])
+DeckSummaryRow = namedtuple('DeckSummaryRow', [
+    'id', 'title', 'description', 'card_count', 'due_count', 'average_ease', 'mastered_percent'])
+
+_deck = Deck.__table__.c
+_flashcard = Flashcard.__table__.c
+_progress = Progress.__table__.c
+_notification = Notification.__table__.c
+_deck_stats = DeckStats.__table__.c
+
+
+def _rows(row_type, statement):
+    return list(map(row_type._make, db.session.execute(statement).tuples()))
+
+
+def search_decks(query):
+    """
+    decks whose title or description contains `query`
+    """
+    return _rows(DeckRow, select(_deck.id, _deck.title, _deck.description).where(
+        _deck.title.contains(query) | _deck.description.contains(query)))
+
+
+def user_decks(user_id):
+    """
+    a user's decks, for pickers
+    """
+    return _rows(DeckRow, select(_deck.id, _deck.title, _deck.description)
+                 .where(_deck.user_id == user_id).order_by(_deck.title))
+
+
+def search_flashcards(query):
+    """
+    flashcards whose question or answer contains `query`
+    """
+    return _rows(FlashcardRow, select(_flashcard.id, _flashcard.question, _flashcard.answer).where(
+        _flashcard.question.contains(query) | _flashcard.answer.contains(query)))
+
+
+def deck_questions(deck_id):
+    """
+    the questions of a deck, for its listing
+    """
+    return _rows(QuestionRow, select(_flashcard.id, _flashcard.question)
+                 .where(_flashcard.deck_id == deck_id))
+
+
+def deck_flashcards(deck_id):
+    """
+    questions and answers of a deck, for the exports
+    """
+    return _rows(FlashcardRow, select(_flashcard.id, _flashcard.question, _flashcard.answer)
+                 .where(_flashcard.deck_id == deck_id))
+
+
+def user_progress(user_id):
+    """
+    a user's progress history, oldest first
+    """
+    return _rows(ProgressRow, select(_progress.date, _progress.cards_reviewed)
+                 .where(_progress.user_id == user_id).order_by(_progress.date))
+
+
+def recent_progress(user_id, limit=7):
+    """
+    a user's latest progress entries, newest first
+    """
+    return _rows(ProgressRow, select(_progress.date, _progress.cards_reviewed)
+                 .where(_progress.user_id == user_id)
+                 .order_by(_progress.date.desc()).limit(limit))
+
+
+def due_counts(deck_ids, now=None):
+    """
+    number of cards due per deck
+    """
+    if not deck_ids:
+        return {}
+    return dict(db.session.execute(
+        select(_flashcard.deck_id, func.count())
+        .where(_flashcard.deck_id.in_(deck_ids), _flashcard.next_review <= (now or datetime.utcnow()))
+        .group_by(_flashcard.deck_id)
+    ).all())
+
+
+def deck_summaries(user_id, now=None):
+    """
+    a user's decks with their card, due and mastery statistics
+    """
+    decks = db.session.execute(
+        select(_deck.id, _deck.title, _deck.description, _deck_stats.card_count,
+               _deck_stats.ease_sum, _deck_stats.mastered_count)
+        .outerjoin(DeckStats.__table__, _deck_stats.deck_id == _deck.id)
+        .where(_deck.user_id == user_id).order_by(_deck.id)
+    ).all()
+    due = due_counts([deck.id for deck in decks], now)
+    return [DeckSummaryRow(
+        deck.id, deck.title, deck.description, deck.card_count or 0, due.get(deck.id, 0),
+        deck.ease_sum / deck.card_count if deck.card_count else None,
+        100.0 * deck.mastered_count / deck.card_count if deck.card_count else 0.0
+    ) for deck in decks]
+
+
+def user_notifications(user_id):
+    """
+    a user's notifications, newest first
+    """
+    return _rows(NotificationRow, select(_notification.id, _notification.message,
+                                         _notification.is_read, _notification.timestamp)
+                 .where(_notification.user_id == user_id)
+                 .order_by(_notification.timestamp.desc()))
@@ -0,0 +1,196 @@
+"""
+Reminder dispatching.
+
+Users pick a reminder time on the reminders page; it is converted to UTC with
+the offset their browser reports and stored as a `Reminder` row whose
+`minute_of_day` is the UTC bucket the time falls into. Once a minute the
+dispatcher (see `flask send-reminders`) selects the buckets that just fired and,
+with one grouped join over `flashcard.next_review`, finds the users in them who
+have cards due. Each batch of users gets its `Notification` rows in a single bulk
+insert, and the matching emails are queued for a background sender thread.
+
+Users are walked bucket by bucket in keyset-paginated batches over the
+`(minute_of_day, user_id)` index, so even a bucket holding a million users is
+processed in bounded memory with index seeks only.
+"""
+import logging
+import queue
+import time
+from datetime import datetime, timedelta
+from threading import Thread
+
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import func, insert, or_, update
+
+from app import app, db, mail
+from app.jobs import job_handler
+from app.models import User, Deck, Flashcard, Notification, Reminder
+
+logger = logging.getLogger(__name__)
+
+REMINDER_MESSAGE = 'You have {count} flashcards due for review.'
+MINUTES_PER_DAY = 24 * 60
+
+_outbox = queue.Queue()
+_sender = None
+
+
+def minute_of_day(moment):
+    """
+    bucket a datetime (or time) falls into
+    """
+    return moment.hour * 60 + moment.minute
+
+
+def parse_reminder_time(value, utc_offset=0):
+    """
+    turn the local 'HH:MM' value posted by the reminders form into a UTC
+    bucket; `utc_offset` is the browser's `getTimezoneOffset()`, in minutes
+    """
+    if not -14 * 60 <= utc_offset <= 14 * 60:
+        raise ValueError(f'Invalid UTC offset {utc_offset}.')
+    return (minute_of_day(datetime.strptime(value, '%H:%M')) + utc_offset) % MINUTES_PER_DAY
+
+
+def _due_users(now, fired_at, after_user_id, limit):
+    """
+    users of the bucket that fired at `fired_at`, past `after_user_id`, that
+    have cards due and were not reminded yet that day, together with their due
+    card count
+    """
+    bucket = minute_of_day(fired_at)
+    start_of_day = fired_at.replace(hour=0, minute=0, second=0, microsecond=0)
+    return db.session.query(
+        Reminder.user_id, User.email, func.count(Flashcard.id).label('due_count')
+    ).join(
+        User, User.id == Reminder.user_id
+    ).join(
+        Deck, Deck.user_id == Reminder.user_id
+    ).join(
+        Flashcard, (Flashcard.deck_id == Deck.id) & (Flashcard.next_review <= now)
+    ).filter(
+        Reminder.minute_of_day == bucket,
+        Reminder.user_id > after_user_id,
+        or_(Reminder.last_sent_at.is_(None), Reminder.last_sent_at < start_of_day)
+    ).group_by(
+        Reminder.user_id, User.email
+    ).order_by(
+        Reminder.user_id
+    ).limit(limit).all()
+
+
+def _notify(rows, now, fired_at):
+    """
+    bulk insert notifications for one batch, mark the reminders sent and queue
+    the emails
+    """
+    db.session.execute(insert(Notification), [
+        {
+            'user_id': row.user_id,
+            'message': REMINDER_MESSAGE.format(count=row.due_count),
+            'is_read': False,
+            'timestamp': now,
+        }
+        for row in rows
+    ])
+    db.session.execute(
+        update(Reminder)
+        .where(Reminder.user_id.in_([row.user_id for row in rows]))
+        # the slot served, not the send time: a slot caught up after midnight
+        # still belongs to the day before
+        .values(last_sent_at=fired_at)
+    )
+    db.session.commit()
+
+    if current_app.config['REMINDER_SEND_EMAIL']:
+        for row in rows:
+            _outbox.put(Message(
+                'Flashcards due for review',
+                sender=current_app.config['MAIL_USERNAME'],
+                recipients=[row.email],
+                body=REMINDER_MESSAGE.format(count=row.due_count)
+            ))
+        _start_sender()
+
+
+def dispatch_reminders(now=None, batch_size=None):
+    """
+    notify every user whose reminder bucket fired and who has cards due
+
+    Buckets missed within the last `REMINDER_CATCHUP_MINUTES` are picked up as
+    well, including those of the previous day just after midnight;
+    `last_sent_at` makes running twice in the same minute harmless. Returns the
+    number of users notified.
+    """
+    now = now or datetime.utcnow()
+    batch_size = batch_size or current_app.config['REMINDER_BATCH_SIZE']
+    catchup = min(current_app.config['REMINDER_CATCHUP_MINUTES'], MINUTES_PER_DAY - 1)
+
+    notified = 0
+    for minutes_ago in range(catchup, -1, -1):
+        fired_at = now - timedelta(minutes=minutes_ago)
+        after_user_id = 0
+        while True:
+            rows = _due_users(now, fired_at, after_user_id, batch_size)
+            if not rows:
+                break
+            _notify(rows, now, fired_at)
+            notified += len(rows)
+            after_user_id = rows[-1].user_id
+            if len(rows) < batch_size:
+                break
+    return notified
+
+
+@job_handler('dispatch_reminders')
+def dispatch_reminders_job(context):
+    """
+    `dispatch_reminders` as a background job
+    """
+    return {'notified': dispatch_reminders()}
+
+
+def _send_queued_emails():
+    """
+    drain the outbox, reusing one SMTP connection for as long as it stays busy
+    """
+    while True:
+        msg = _outbox.get()
+        with app.app_context():
+            try:
+                with mail.connect() as conn:
+                    while True:
+                        conn.send(msg)
+                        _outbox.task_done()
+                        msg = _outbox.get_nowait()
+            except queue.Empty:
+                pass
+            except Exception:
+                _outbox.task_done()
+                logger.exception('Sending reminder emails failed')
+
+
+def _start_sender():
+    global _sender
+    if _sender is None or not _sender.is_alive():
+        _sender = Thread(target=_send_queued_emails, name='reminder-mailer', daemon=True)
+        _sender.start()
+
+
+def wait_for_emails():
+    """
+    block until every queued reminder email was handed to the mail server
+    """
+    _outbox.join()
+
+
+def run_every_minute():
+    """
+    dispatch reminders at the start of every minute until interrupted
+    """
+    while True:
+        with app.app_context():
+            count = dispatch_reminders()
+        logger.info('Reminded %d users', count)
+        time.sleep(60 - datetime.utcnow().second)
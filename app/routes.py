@@ -2,12 +2,15 @@ from flask import render_template, redirect, url_for, flash, request, send_file
 from flask_login import login_user, logout_user, login_required, current_user
 from datetime import datetime
 from app import app, db, mail
-from app.models import User, Deck, Flashcard, Progress, Notification, Streak, Leaderboard
+from app.models import User, Deck, Flashcard, Notification, Streak, Leaderboard, Reminder
+from app.reminders import parse_reminder_time
+from app.templating import render_fragment
+from app import read_models
+from sqlalchemy.orm import joinedload
 from app.forms import RegistrationForm, LoginForm, DeckForm, FlashcardForm
 from flask_mail import Message
-from threading import Thread
 import csv
-from io import StringIO
+from io import StringIO, BytesIO
 from app import login_manager
 import json
 
@@ -16,7 +19,19 @@ def home():
     """
     home page
     """
-    return render_template('index.html')
+    decks = read_models.deck_summaries(current_user.id) if current_user.is_authenticated else []
+    return render_template('index.html', decks=decks)
+
+@app.route('/dashboard')
+@login_required
+def dashboard():
+    """
+    decks, recent progress and due cards at a glance
+    """
+    decks = read_models.deck_summaries(current_user.id)
+    return render_template('dashboard.html', decks=decks,
+                           progress_data=read_models.recent_progress(current_user.id),
+                           due_flashcards=sum(deck.due_count for deck in decks))
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -62,10 +77,8 @@ def search():
     """
     query = request.args.get('query')  
     if query:
-        decks = Deck.query.filter(Deck.title.contains(query) | 
-                                  Deck.description.contains(query)).all()
-        flashcards = Flashcard.query.filter(Flashcard.question.contains(query) | 
-                                            Flashcard.answer.contains(query)).all()
+        decks = read_models.search_decks(query)
+        flashcards = read_models.search_flashcards(query)
         return render_template('search.html', decks=decks, flashcards=flashcards, query=query)
     return render_template('search.html')
 
@@ -91,7 +104,12 @@ def view_deck(deck_id):
     viewing deck
     """
     deck = Deck.query.get_or_404(deck_id)
-    return render_template('deck.html', deck=deck)
+    flashcard_list = render_fragment(
+        ('deck_flashcards', deck.id, deck.version),
+        '_flashcard_list.html',
+        lambda: {'flashcards': read_models.deck_questions(deck.id)}
+    )
+    return render_template('deck.html', deck=deck, flashcard_list=flashcard_list)
 
 @app.route('/deck/<int:deck_id>/review', methods=['GET', 'POST'])
 @login_required
@@ -151,6 +169,13 @@ def add_flashcard(deck_id):
     form = FlashcardForm()
 
     if form.validate_on_submit():
+        duplicate = Flashcard.query.filter_by(
+            deck_id=deck.id,
+            content_hash=Flashcard.compute_content_hash(form.question.data)
+        ).first()
+        if duplicate:
+            flash('A flashcard with the same question is already in the deck.', 'info')
+            return redirect(url_for('view_deck', deck_id=deck.id))
         flashcard = Flashcard(
             question=form.question.data,
             answer=form.answer.data,
@@ -166,7 +191,7 @@ def add_flashcard(deck_id):
 @app.route('/progress')
 @login_required
 def progress():
-    progress_data = Progress.query.filter_by(user_id=current_user.id).all()
+    progress_data = read_models.user_progress(current_user.id)
 
     dates = [p.date.strftime('%Y-%m-%d') for p in progress_data] if progress_data else []
     counts = [p.cards_reviewed for p in progress_data] if progress_data else []
@@ -175,13 +200,20 @@ def progress():
 
 @app.route('/leaderboard')
 def leaderboard():
-    top_users = Leaderboard.query.order_by(Leaderboard.score.desc()).limit(10).all()
-    return render_template('leaderboard.html', top_users=top_users)
+    top_scores = db.session.query(Leaderboard.user_id, Leaderboard.score).order_by(
+        Leaderboard.score.desc()).limit(10).all()
+    leaderboard_table = render_fragment(
+        ('leaderboard', tuple(map(tuple, top_scores))),
+        '_leaderboard_table.html',
+        lambda: {'top_users': Leaderboard.query.options(joinedload(Leaderboard.user))
+                 .order_by(Leaderboard.score.desc()).limit(10).all()}
+    )
+    return render_template('leaderboard.html', leaderboard_table=leaderboard_table)
 
 @app.route('/notifications')
 @login_required
 def notifications():
-    user_notifications = Notification.query.filter_by(user_id=current_user.id).order_by(Notification.timestamp.desc()).all()
+    user_notifications = read_models.user_notifications(current_user.id)
     return render_template('notifications.html', notifications=user_notifications)
 
 @app.route('/notifications/mark_as_read/<int:notification_id>')
@@ -194,20 +226,41 @@ def mark_as_read(notification_id):
         flash('Notification marked as read.', 'success')
     return redirect(url_for('notifications'))
 
+@app.route('/reminders', methods=['GET', 'POST'])
+@login_required
+def reminders():
+    """
+    setting the daily review reminder
+    """
+    if request.method == 'POST':
+        try:
+            minute = parse_reminder_time(request.form.get('reminder_time', ''),
+                                         request.form.get('utc_offset', 0, type=int))
+        except ValueError:
+            flash('Invalid reminder time.', 'danger')
+            return render_template('reminders.html')
+        reminder = Reminder.query.filter_by(user_id=current_user.id).first()
+        if not reminder:
+            reminder = Reminder(user_id=current_user.id, minute_of_day=minute)
+            db.session.add(reminder)
+        reminder.minute_of_day = minute
+        db.session.commit()
+        flash('Reminder set!', 'success')
+        return redirect(url_for('notifications'))
+    return render_template('reminders.html')
+
 @app.route('/deck/<int:deck_id>/export/json')
 @login_required
 def export_deck_json(deck_id):
     deck = Deck.query.get_or_404(deck_id)
-    flashcards = Flashcard.query.filter_by(deck_id=deck_id).all()
+    flashcards = read_models.deck_flashcards(deck_id)
     deck_data = {
         'title': deck.title,
         'description': deck.description,
         'flashcards': [{'question': f.question, 'answer': f.answer} for f in flashcards]
     }
     json_data = json.dumps(deck_data, indent=4)
-    file = StringIO()
-    file.write(json_data)
-    file.seek(0)
+    file = BytesIO(json_data.encode('utf-8'))
     return send_file(
         file,
         as_attachment=True,
@@ -224,7 +277,7 @@ from io import StringIO, BytesIO
 @login_required
 def export_deck_csv(deck_id):
     deck = Deck.query.get_or_404(deck_id)
-    flashcards = Flashcard.query.filter_by(deck_id=deck_id).all()
+    flashcards = read_models.deck_flashcards(deck_id)
     output = StringIO()
     writer = csv.writer(output)
     writer.writerow(['Question', 'Answer'])
@@ -243,6 +296,30 @@ def export_deck_csv(deck_id):
 
 from flask import request, flash
 import json
+from app.packages import write_package
+import unicodedata
+from urllib.parse import quote
+from flask import Response, stream_with_context, jsonify
+from app.jobs import enqueue, cancel, save_upload
+from app import forecast
+from app.cloning import clone_deck
+from app.models import Job
+
+PACKAGE_MIMETYPE = 'application/vnd.flashcards.deck'
+
+def enqueue_import(file, format, suffix, **payload):
+    """
+    hand an uploaded deck over to a background import job
+    """
+    job = enqueue('import_deck', dict(
+        payload,
+        path=save_upload(file, suffix),
+        format=format,
+        user_id=current_user.id,
+        deck_id=request.form.get('deck_id', type=int),
+        on_duplicate=request.form.get('on_duplicate', 'skip')
+    ), user_id=current_user.id)
+    return redirect(url_for('job_page', job_id=job.id))
 
 @app.route('/deck/import/json', methods=['GET', 'POST'])
 @login_required
@@ -250,31 +327,10 @@ def import_deck_json():
     if request.method == 'POST':
         file = request.files['file']
         if file and file.filename.endswith('.json'):
-            try:
-                data = json.load(file)
-                deck = Deck(
-                    title=data['title'],
-                    description=data.get('description', ''),
-                    author=current_user
-                )
-                db.session.add(deck)
-                db.session.commit()
-                for card in data['flashcards']:
-                    flashcard = Flashcard(
-                        question=card['question'],
-                        answer=card['answer'],
-                        deck_id=deck.id
-                    )
-                    db.session.add(flashcard)
-                db.session.commit()
-
-                flash('Deck imported successfully!', 'success')
-                return redirect(url_for('view_deck', deck_id=deck.id))
-            except Exception as e:
-                flash(f'Error importing deck: {str(e)}', 'danger')
-        else:
-            flash('Invalid file format. Please upload a JSON file.', 'danger')
-    return render_template('import_deck_json.html')
+            return enqueue_import(file, 'json', '.json')
+        flash('Invalid file format. Please upload a JSON file.', 'danger')
+    return render_template('import_deck_json.html',
+                           decks=read_models.user_decks(current_user.id))
 
 @app.route('/deck/import/csv', methods=['GET', 'POST'])
 @login_required
@@ -282,33 +338,91 @@ def import_deck_csv():
     if request.method == 'POST':
         file = request.files['file']
         if file and file.filename.endswith('.csv'):
-            try:
-                data = file.read().decode('utf-8').splitlines()
-                reader = csv.reader(data)
-                next(reader) 
-                deck = Deck(
-                    title=request.form.get('title', 'Imported Deck'),
-                    description=request.form.get('description', ''),
-                    author=current_user
-                )
-                db.session.add(deck)
-                db.session.commit()
-                for row in reader:
-                    flashcard = Flashcard(
-                        question=row[0],
-                        answer=row[1],
-                        deck_id=deck.id
-                    )
-                    db.session.add(flashcard)
-                db.session.commit()
-
-                flash('Deck imported successfully!', 'success')
-                return redirect(url_for('view_deck', deck_id=deck.id))
-            except Exception as e:
-                flash(f'Error importing deck: {str(e)}', 'danger')
-        else:
-            flash('Invalid file format. Please upload a CSV file.', 'danger')
-    return render_template('import_deck_csv.html')
+            return enqueue_import(file, 'csv', '.csv',
+                                  title=request.form.get('title', 'Imported Deck'),
+                                  description=request.form.get('description', ''))
+        flash('Invalid file format. Please upload a CSV file.', 'danger')
+    return render_template('import_deck_csv.html',
+                           decks=read_models.user_decks(current_user.id))
+
+def set_download_name(response, download_name):
+    """
+    Content-Disposition as `send_file(download_name=...)` sets it: non-ASCII
+    names get an ASCII fallback and an RFC 5987 `filename*`
+    """
+    try:
+        download_name.encode('ascii')
+    except UnicodeEncodeError:
+        fallback = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+        names = {'filename': fallback,
+                 'filename*': f"UTF-8''{quote(download_name, safe='!#$&+^`|~')}"}
+    else:
+        names = {'filename': download_name}
+    response.headers.set('Content-Disposition', 'attachment', **names)
+    return response
+
+@app.route('/deck/<int:deck_id>/export/package')
+@login_required
+def export_deck_package(deck_id):
+    deck = Deck.query.get_or_404(deck_id)
+    response = Response(stream_with_context(write_package(deck)), mimetype=PACKAGE_MIMETYPE)
+    return set_download_name(response, f'{deck.title}.fcdk')
+
+@app.route('/deck/import/package', methods=['GET', 'POST'])
+@login_required
+def import_deck_package():
+    if request.method == 'POST':
+        file = request.files['file']
+        if file and file.filename.endswith('.fcdk'):
+            return enqueue_import(file, 'package', '.fcdk')
+        flash('Invalid file format. Please upload a .fcdk deck package.', 'danger')
+    return render_template('import_deck_package.html',
+                           decks=read_models.user_decks(current_user.id))
+
+@app.route('/jobs/<int:job_id>')
+@login_required
+def job_page(job_id):
+    job = Job.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+    return render_template('job.html', job=job)
+
+@app.route('/jobs/<int:job_id>/status')
+@login_required
+def job_status(job_id):
+    job = Job.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<int:job_id>/cancel', methods=['POST'])
+@login_required
+def cancel_job(job_id):
+    job = Job.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+    cancel(job)
+    flash('Cancellation requested.', 'info')
+    return redirect(url_for('job_page', job_id=job.id))
+
+@app.route('/deck/<int:deck_id>/clone', methods=['POST'])
+@login_required
+def clone_deck_route(deck_id):
+    deck = Deck.query.get_or_404(deck_id)
+    copy, created = clone_deck(deck, current_user,
+                               reset_scheduling=not request.form.get('keep_scheduling'))
+    if created:
+        flash('Deck added to your decks!', 'success')
+    else:
+        flash('This deck is already in your decks.', 'info')
+    return redirect(url_for('view_deck', deck_id=copy.id))
+
+@app.route('/forecast')
+@login_required
+def review_forecast():
+    histogram = forecast.user_forecast(current_user.id, request.args.get('days', 30, type=int))
+    return jsonify(forecast.as_json(histogram))
+
+@app.route('/deck/<int:deck_id>/forecast')
+@login_required
+def deck_review_forecast(deck_id):
+    deck = Deck.query.get_or_404(deck_id)
+    histogram = forecast.deck_forecast(deck.id, request.args.get('days', 30, type=int))
+    return jsonify(forecast.as_json(histogram))
 
 @app.errorhandler(404)
 def page_not_found(error):
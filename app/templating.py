@@ -0,0 +1,99 @@
+"""
+Template compilation and fragment caching.
+
+Compiled templates are written to a Jinja bytecode cache on disk
+(`JINJA_BYTECODE_CACHE_DIR`, the instance folder by default), so every worker
+after the first loads them instead of compiling; `flask compile-templates`
+fills the cache ahead of a deploy.
+
+Expensive page fragments, like the card list of a deck or the leaderboard table,
+are rendered through `render_fragment()`. Their keys include the version of the
+data they show (`Deck.version`, the current top scores), so unchanged data is
+served from memory without querying or rendering, and changed data simply misses.
+"""
+import os
+from collections import OrderedDict
+from threading import Lock
+
+from flask import render_template
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+
+from app import app
+
+
+class FragmentCache:
+    """
+    thread safe LRU cache of rendered fragments, bounded by their total length
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_size:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+fragments = FragmentCache(app.config['FRAGMENT_CACHE_SIZE'])
+
+
+def render_fragment(key, template_name, context):
+    """
+    render a template fragment, or reuse the rendering stored under `key`
+
+    `context` is a callable returning the template context; it is only called on
+    a miss, so the queries feeding the fragment are skipped as well.
+    """
+    html = fragments.get(key)
+    if html is None:
+        html = render_template(template_name, **context())
+        fragments.set(key, html)
+    return Markup(html)
+
+
+def init_bytecode_cache():
+    """
+    share compiled templates between workers through the filesystem
+    """
+    directory = app.config['JINJA_BYTECODE_CACHE_DIR'] or \
+        os.path.join(app.instance_path, 'jinja_cache')
+    os.makedirs(directory, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+
+def compile_templates():
+    """
+    compile every template into the bytecode cache; returns their names
+    """
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        app.jinja_env.get_template(name)
+    return names
+
+
+init_bytecode_cache()
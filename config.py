@@ -15,6 +15,35 @@ Attributes:
     MAIL_USE_TLS (bool): Enables TLS encryption for email communication.
     MAIL_USERNAME (str): The username for the email account used to send emails.
     MAIL_PASSWORD (str): The password for the email account.
+    REMINDER_BATCH_SIZE (int): Users notified per bulk insert by the reminder dispatcher.
+    REMINDER_CATCHUP_MINUTES (int): How many missed reminder minutes a dispatch run picks up.
+    REMINDER_SEND_EMAIL (bool): Whether reminders are also sent by email.
+    IMPORT_CHUNK_SIZE (int): Cards deduplicated and written per batch when importing.
+    COMPRESS_ENABLED (bool): Compresses responses according to `Accept-Encoding`.
+    COMPRESS_MIMETYPES (list): Mimetypes eligible for compression.
+    COMPRESS_MIN_SIZE (int): Buffered responses smaller than this are sent uncompressed.
+    COMPRESS_LEVEL (int): gzip level for dynamic responses.
+    COMPRESS_BROTLI_QUALITY (int): brotli quality for dynamic responses.
+    ASSETS_FINGERPRINT (bool): Links static assets by content-hashed, immutable URLs.
+    JINJA_BYTECODE_CACHE_DIR (str): Directory compiled templates are shared through.
+    FRAGMENT_CACHE_SIZE (int): Total characters of rendered fragments kept in memory.
+    PACKAGE_BLOCK_SIZE (int): Cards per compressed block in binary deck packages.
+    MAINTENANCE_NOTIFICATION_RETENTION_DAYS (int): Age after which read notifications are archived.
+    MAINTENANCE_PROGRESS_COMPACT_AFTER_DAYS (int): Age after which progress rows are compacted.
+    MAINTENANCE_PROGRESS_BUCKET_DAYS (int): Span of one compacted progress row, in days.
+    MAINTENANCE_BATCH_SIZE (int): Rows (or decks) handled per maintenance transaction.
+    MAINTENANCE_MAX_ROWS_PER_SECOND (int): Throughput cap of a maintenance run.
+    MAINTENANCE_VACUUM_PAGES (int): Pages released per incremental VACUUM on SQLite.
+    JOBS_EAGER (bool): Run background jobs synchronously inside `enqueue` (for tests).
+    JOBS_EMBEDDED_WORKERS (int): Worker threads the web process starts on first use; 0 leaves jobs to `flask jobs-work`.
+    JOBS_POLL_INTERVAL (float): Seconds an idle worker waits before looking for jobs again.
+    JOBS_RETRY_DELAY (float): Seconds before the first retry of a failed job; doubled on every attempt.
+    JOBS_STALE_AFTER (int): Seconds without a heartbeat after which a running job is assumed abandoned and requeued.
+    JOBS_UPLOAD_DIR (str): Where uploads waiting for a job are kept, `instance/uploads` by default.
+    FORECAST_MAX_DAYS (int): Longest review-load forecast, in days.
+    FORECAST_RATING (int): Rating (1-3) every future review is assumed to get.
+    FORECAST_CHUNK_SIZE (int): Card ids per chunk of the process-pool global forecast.
+    CLONE_BATCH_SIZE (int): Users whose copies of a deck are created per transaction when cloning.
 
 The values of `SECRET_KEY`, `SQLALCHEMY_DATABASE_URI`, `MAIL_USERNAME`, and `MAIL_PASSWORD`
 are read from environment variables. If the environment variables are not set, default values 
@@ -40,6 +69,35 @@ class Config:
         MAIL_USE_TLS (bool): Enables TLS encryption for email communication.
         MAIL_USERNAME (str): The username for the email account used to send emails.
         MAIL_PASSWORD (str): The password for the email account.
+        REMINDER_BATCH_SIZE (int): Users notified per bulk insert by the reminder dispatcher.
+        REMINDER_CATCHUP_MINUTES (int): How many missed reminder minutes a dispatch run picks up.
+        REMINDER_SEND_EMAIL (bool): Whether reminders are also sent by email.
+        IMPORT_CHUNK_SIZE (int): Cards deduplicated and written per batch when importing.
+        COMPRESS_ENABLED (bool): Compresses responses according to `Accept-Encoding`.
+        COMPRESS_MIMETYPES (list): Mimetypes eligible for compression.
+        COMPRESS_MIN_SIZE (int): Buffered responses smaller than this are sent uncompressed.
+        COMPRESS_LEVEL (int): gzip level for dynamic responses.
+        COMPRESS_BROTLI_QUALITY (int): brotli quality for dynamic responses.
+        ASSETS_FINGERPRINT (bool): Links static assets by content-hashed, immutable URLs.
+        JINJA_BYTECODE_CACHE_DIR (str): Directory compiled templates are shared through.
+        FRAGMENT_CACHE_SIZE (int): Total characters of rendered fragments kept in memory.
+        PACKAGE_BLOCK_SIZE (int): Cards per compressed block in binary deck packages.
+        MAINTENANCE_NOTIFICATION_RETENTION_DAYS (int): Age after which read notifications are archived.
+        MAINTENANCE_PROGRESS_COMPACT_AFTER_DAYS (int): Age after which progress rows are compacted.
+        MAINTENANCE_PROGRESS_BUCKET_DAYS (int): Span of one compacted progress row, in days.
+        MAINTENANCE_BATCH_SIZE (int): Rows (or decks) handled per maintenance transaction.
+        MAINTENANCE_MAX_ROWS_PER_SECOND (int): Throughput cap of a maintenance run.
+        MAINTENANCE_VACUUM_PAGES (int): Pages released per incremental VACUUM on SQLite.
+        JOBS_EAGER (bool): Run background jobs synchronously inside `enqueue` (for tests).
+        JOBS_EMBEDDED_WORKERS (int): Worker threads the web process starts on first use; 0 leaves jobs to `flask jobs-work`.
+        JOBS_POLL_INTERVAL (float): Seconds an idle worker waits before looking for jobs again.
+        JOBS_RETRY_DELAY (float): Seconds before the first retry of a failed job; doubled on every attempt.
+        JOBS_STALE_AFTER (int): Seconds without a heartbeat after which a running job is assumed abandoned and requeued.
+        JOBS_UPLOAD_DIR (str): Where uploads waiting for a job are kept, `instance/uploads` by default.
+        FORECAST_MAX_DAYS (int): Longest review-load forecast, in days.
+        FORECAST_RATING (int): Rating (1-3) every future review is assumed to get.
+        FORECAST_CHUNK_SIZE (int): Card ids per chunk of the process-pool global forecast.
+        CLONE_BATCH_SIZE (int): Users whose copies of a deck are created per transaction when cloning.
 
     The values of `SECRET_KEY`, `SQLALCHEMY_DATABASE_URI`, `MAIL_USERNAME`, and `MAIL_PASSWORD`
     are read from environment variables. If the environment variables are not set, default values 
@@ -53,3 +111,35 @@ class Config:
     MAIL_USE_TLS = True
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+    REMINDER_BATCH_SIZE = 5000
+    REMINDER_CATCHUP_MINUTES = 5
+    REMINDER_SEND_EMAIL = bool(MAIL_USERNAME)
+    IMPORT_CHUNK_SIZE = 1000
+    COMPRESS_ENABLED = True
+    COMPRESS_MIMETYPES = [
+        'text/html', 'text/css', 'text/csv', 'text/plain', 'text/javascript',
+        'application/javascript', 'application/json', 'image/svg+xml',
+    ]
+    COMPRESS_MIN_SIZE = 500
+    COMPRESS_LEVEL = 6
+    COMPRESS_BROTLI_QUALITY = 5
+    ASSETS_FINGERPRINT = True
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR')
+    FRAGMENT_CACHE_SIZE = 32 * 1024 * 1024
+    PACKAGE_BLOCK_SIZE = 10000
+    MAINTENANCE_NOTIFICATION_RETENTION_DAYS = 90
+    MAINTENANCE_PROGRESS_COMPACT_AFTER_DAYS = 90
+    MAINTENANCE_PROGRESS_BUCKET_DAYS = 7
+    MAINTENANCE_BATCH_SIZE = 1000
+    MAINTENANCE_MAX_ROWS_PER_SECOND = 5000
+    MAINTENANCE_VACUUM_PAGES = 1000
+    JOBS_EAGER = False
+    JOBS_EMBEDDED_WORKERS = 2
+    JOBS_POLL_INTERVAL = 1.0
+    JOBS_RETRY_DELAY = 30
+    JOBS_STALE_AFTER = 3600
+    JOBS_UPLOAD_DIR = os.environ.get('JOBS_UPLOAD_DIR')
+    FORECAST_MAX_DAYS = 365
+    FORECAST_RATING = 2
+    FORECAST_CHUNK_SIZE = 100000
+    CLONE_BATCH_SIZE = 500
@@ -0,0 +1,40 @@
+"""Reminders and review indexes
+
+Revision ID: 7c3e9a41b2d5
+Revises: 2af1c4e7fe4c
+Create Date: 2026-10-19 09:12:41.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3e9a41b2d5'
+down_revision = '2af1c4e7fe4c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reminder',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('minute_of_day', sa.Integer(), nullable=False),
+    sa.Column('last_sent_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id')
+    )
+    op.create_index('ix_reminder_minute_of_day_user_id', 'reminder',
+                    ['minute_of_day', 'user_id'], unique=False)
+    op.create_index(op.f('ix_deck_user_id'), 'deck', ['user_id'], unique=False)
+    op.create_index('ix_flashcard_deck_id_next_review', 'flashcard',
+                    ['deck_id', 'next_review'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_flashcard_deck_id_next_review', table_name='flashcard')
+    op.drop_index(op.f('ix_deck_user_id'), table_name='deck')
+    op.drop_index('ix_reminder_minute_of_day_user_id', table_name='reminder')
+    op.drop_table('reminder')
@@ -0,0 +1,66 @@
+"""Flashcard content hash
+
+Revision ID: 9d84f1c06a3e
+Revises: 7c3e9a41b2d5
+Create Date: 2026-10-19 11:40:07.218664
+
+"""
+import hashlib
+import re
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d84f1c06a3e'
+down_revision = '7c3e9a41b2d5'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def _content_hash(question):
+    # frozen copy of Flashcard.compute_content_hash at the time of this revision
+    normalized = unicodedata.normalize('NFKC', question or '').casefold()
+    normalized = re.sub(r'\s+', ' ', normalized).strip()
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+def upgrade():
+    with op.batch_alter_table('flashcard') as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=40), nullable=True))
+
+    flashcard = sa.table('flashcard',
+                         sa.column('id', sa.Integer),
+                         sa.column('question', sa.Text),
+                         sa.column('content_hash', sa.String))
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(flashcard.c.id, flashcard.c.question)
+            .where(flashcard.c.id > last_id)
+            .order_by(flashcard.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            flashcard.update()
+            .where(flashcard.c.id == sa.bindparam('card_id'))
+            .values(content_hash=sa.bindparam('hash')),
+            [{'card_id': row.id, 'hash': _content_hash(row.question)} for row in rows]
+        )
+        last_id = rows[-1].id
+
+    op.create_index('ix_flashcard_deck_id_content_hash', 'flashcard',
+                    ['deck_id', 'content_hash'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_flashcard_deck_id_content_hash', table_name='flashcard')
+    with op.batch_alter_table('flashcard') as batch_op:
+        batch_op.drop_column('content_hash')
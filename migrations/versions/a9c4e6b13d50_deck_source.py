@@ -0,0 +1,30 @@
+"""Deck clone source
+
+Revision ID: a9c4e6b13d50
+Revises: f5b2d9e41c83
+Create Date: 2026-10-19 21:03:27.859104
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c4e6b13d50'
+down_revision = 'f5b2d9e41c83'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('deck') as batch_op:
+        batch_op.add_column(sa.Column('source_deck_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_deck_source_deck_id_deck', 'deck', ['source_deck_id'], ['id'])
+        batch_op.create_index('ix_deck_source_deck_id_user_id', ['source_deck_id', 'user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('deck') as batch_op:
+        batch_op.drop_index('ix_deck_source_deck_id_user_id')
+        batch_op.drop_constraint('fk_deck_source_deck_id_deck', type_='foreignkey')
+        batch_op.drop_column('source_deck_id')
@@ -0,0 +1,26 @@
+"""Deck version
+
+Revision ID: b5e2d07f9c18
+Revises: 9d84f1c06a3e
+Create Date: 2026-10-19 14:03:55.871420
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e2d07f9c18'
+down_revision = '9d84f1c06a3e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('deck') as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('deck') as batch_op:
+        batch_op.drop_column('version')
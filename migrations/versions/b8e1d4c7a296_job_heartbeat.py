@@ -0,0 +1,26 @@
+"""Job heartbeat
+
+Revision ID: b8e1d4c7a296
+Revises: a9c4e6b13d50
+Create Date: 2026-10-20 10:14:52.302118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e1d4c7a296'
+down_revision = 'a9c4e6b13d50'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('job') as batch_op:
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('job') as batch_op:
+        batch_op.drop_column('heartbeat_at')
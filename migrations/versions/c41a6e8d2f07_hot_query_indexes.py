@@ -0,0 +1,35 @@
+"""Indexes for hot queries
+
+Revision ID: c41a6e8d2f07
+Revises: b5e2d07f9c18
+Create Date: 2026-10-19 16:27:13.042951
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41a6e8d2f07'
+down_revision = 'b5e2d07f9c18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_flashcard_deck_id'), 'flashcard', ['deck_id'], unique=False)
+    op.create_index('ix_notification_user_id_timestamp', 'notification',
+                    ['user_id', 'timestamp'], unique=False)
+    op.create_index('ix_progress_user_id_date', 'progress', ['user_id', 'date'], unique=False)
+    op.create_index(op.f('ix_leaderboard_score'), 'leaderboard', ['score'], unique=False)
+    op.create_index(op.f('ix_leaderboard_user_id'), 'leaderboard', ['user_id'], unique=False)
+    op.create_index(op.f('ix_streak_user_id'), 'streak', ['user_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_streak_user_id'), table_name='streak')
+    op.drop_index(op.f('ix_leaderboard_user_id'), table_name='leaderboard')
+    op.drop_index(op.f('ix_leaderboard_score'), table_name='leaderboard')
+    op.drop_index('ix_progress_user_id_date', table_name='progress')
+    op.drop_index('ix_notification_user_id_timestamp', table_name='notification')
+    op.drop_index(op.f('ix_flashcard_deck_id'), table_name='flashcard')
@@ -0,0 +1,25 @@
+"""Drop redundant flashcard deck index
+
+Revision ID: c9f2a6e3d814
+Revises: b8e1d4c7a296
+Create Date: 2026-10-20 11:02:37.615420
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9f2a6e3d814'
+down_revision = 'b8e1d4c7a296'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # (deck_id, next_review) and (deck_id, content_hash) cover deck_id lookups
+    op.drop_index('ix_flashcard_deck_id', table_name='flashcard')
+
+
+def downgrade():
+    op.create_index('ix_flashcard_deck_id', 'flashcard', ['deck_id'], unique=False)
@@ -0,0 +1,33 @@
+"""Own primary key for archived notifications
+
+Revision ID: d1a7c3f95b48
+Revises: c9f2a6e3d814
+Create Date: 2026-10-20 14:21:05.118342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1a7c3f95b48'
+down_revision = 'c9f2a6e3d814'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('notification_archive') as batch_op:
+        batch_op.add_column(sa.Column('notification_id', sa.Integer(), nullable=True))
+    # rows archived so far were keyed by their notification id
+    op.execute('UPDATE notification_archive SET notification_id = id')
+    with op.batch_alter_table('notification_archive') as batch_op:
+        batch_op.alter_column('notification_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_index(batch_op.f('ix_notification_archive_notification_id'),
+                              ['notification_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notification_archive') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_notification_archive_notification_id'))
+        batch_op.drop_column('notification_id')
@@ -0,0 +1,43 @@
+"""Notification archive and maintenance checkpoints
+
+Revision ID: d7f3b9a15e62
+Revises: c41a6e8d2f07
+Create Date: 2026-10-19 18:45:30.662197
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7f3b9a15e62'
+down_revision = 'c41a6e8d2f07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notification_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('message', sa.String(length=200), nullable=False),
+    sa.Column('is_read', sa.Boolean(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_notification_archive_user_id'), 'notification_archive',
+                    ['user_id'], unique=False)
+    op.create_table('maintenance_checkpoint',
+    sa.Column('job', sa.String(length=50), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('job')
+    )
+
+
+def downgrade():
+    op.drop_table('maintenance_checkpoint')
+    op.drop_index(op.f('ix_notification_archive_user_id'), table_name='notification_archive')
+    op.drop_table('notification_archive')
@@ -0,0 +1,34 @@
+"""One clone of a deck per user
+
+Revision ID: e6b3f8d20c57
+Revises: d1a7c3f95b48
+Create Date: 2026-10-20 15:40:18.904736
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6b3f8d20c57'
+down_revision = 'd1a7c3f95b48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # detach all but the first copy of duplicated clones; they stay ordinary decks
+    op.execute(
+        'UPDATE deck SET source_deck_id = NULL WHERE source_deck_id IS NOT NULL AND id > ('
+        'SELECT MIN(original.id) FROM deck AS original '
+        'WHERE original.source_deck_id = deck.source_deck_id AND original.user_id = deck.user_id)'
+    )
+    with op.batch_alter_table('deck') as batch_op:
+        batch_op.drop_index('ix_deck_source_deck_id_user_id')
+        batch_op.create_index('ix_deck_source_deck_id_user_id', ['source_deck_id', 'user_id'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('deck') as batch_op:
+        batch_op.drop_index('ix_deck_source_deck_id_user_id')
+        batch_op.create_index('ix_deck_source_deck_id_user_id', ['source_deck_id', 'user_id'], unique=False)
@@ -0,0 +1,40 @@
+"""Per-deck statistics
+
+Revision ID: f5b2d9e41c83
+Revises: e3a8c5f20b71
+Create Date: 2026-10-19 20:14:51.206318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5b2d9e41c83'
+down_revision = 'e3a8c5f20b71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('deck_stats',
+    sa.Column('deck_id', sa.Integer(), nullable=False),
+    sa.Column('card_count', sa.Integer(), nullable=False),
+    sa.Column('ease_sum', sa.Float(), nullable=False),
+    sa.Column('mastered_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['deck_id'], ['deck.id'], ),
+    sa.PrimaryKeyConstraint('deck_id')
+    )
+    # 21 days is DeckStats.MASTERED_INTERVAL
+    op.execute(
+        'INSERT INTO deck_stats (deck_id, card_count, ease_sum, mastered_count) '
+        'SELECT deck.id, COUNT(flashcard.id), '
+        'COALESCE(SUM(CASE WHEN flashcard.id IS NOT NULL THEN COALESCE(flashcard.ease_factor, 2.5) END), 0), '
+        'COALESCE(SUM(CASE WHEN flashcard."interval" >= 21 THEN 1 ELSE 0 END), 0) '
+        'FROM deck LEFT OUTER JOIN flashcard ON flashcard.deck_id = deck.id '
+        'GROUP BY deck.id'
+    )
+
+
+def downgrade():
+    op.drop_table('deck_stats')
@@ -13,6 +13,7 @@ def client():
     Sets up and tears down the database for each test.
     """
     app.config["TESTING"] = True
+    app.config["JOBS_EAGER"] = True
     app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
     with app.test_client() as client:
         with app.app_context():
@@ -20,3 +21,48 @@ def client():
         yield client
         with app.app_context():
             db.drop_all()
+
+@pytest.fixture
+def make_user():
+    """
+    Creates users inside the current app context; the email is derived from
+    the username.
+    """
+    def make(username="learner"):
+        user = User(username=username, email=f"{username}@example.com", password_hash="x")
+        db.session.add(user)
+        db.session.flush()
+        return user
+    return make
+
+@pytest.fixture
+def make_deck(make_user):
+    """
+    Creates and commits a deck with the given cards (dicts of Flashcard
+    columns), owned by `user` or by a new one.
+    """
+    def make(title="Deck", user=None, cards=(), **columns):
+        user = user or make_user()
+        deck = Deck(title=title, user_id=user.id, **columns)
+        db.session.add(deck)
+        db.session.flush()
+        db.session.add_all(Flashcard(deck_id=deck.id, **card) for card in cards)
+        db.session.commit()
+        return deck
+    return make
+
+@pytest.fixture
+def login(client, make_user):
+    """
+    Logs the test client in as the user with the given id, or as a new user;
+    returns the id.
+    """
+    def log_in(user_id=None):
+        if user_id is None:
+            with app.app_context():
+                user_id = make_user().id
+                db.session.commit()
+        with client.session_transaction() as session:
+            session["_user_id"] = str(user_id)
+        return user_id
+    return log_in
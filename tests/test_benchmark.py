@@ -0,0 +1,12 @@
+from app import app
+from app import benchmark
+
+def test_benchmark_times_every_listing_page(client):
+    """Test that the benchmark seeds once and reports time and memory per page."""
+    with app.app_context():
+        assert benchmark.seed(50)
+        assert not benchmark.seed(50)
+    result = benchmark.run(runs=1)
+    assert set(result) == {"search", "view_deck", "progress", "notifications", "export_json", "export_csv"}
+    assert all(page["peak"] > 0 for page in result.values())
+    assert "peak MiB" in benchmark.format_report(result)
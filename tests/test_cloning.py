@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import app, db
+from app import cloning
+from app.cloning import clone_deck, clone_deck_to_users
+from app.jobs import enqueue
+from app.models import Deck, DeckStats, Flashcard
+
+@pytest.fixture
+def shared_deck(make_user, make_deck):
+    """
+    Creates users of whom the first owns a deck of five mastered cards.
+    """
+    def make(users=3):
+        people = [make_user(f"sharer{i}") for i in range(users)]
+        cards = [dict(question=f"Q{i}", answer=f"A{i}", interval=30, repetitions=4, ease_factor=2.0,
+                      next_review=datetime.utcnow() + timedelta(days=10)) for i in range(5)]
+        return people, make_deck("Shared", people[0], cards, description="Popular")
+    return make
+
+def test_clone_resets_scheduling(client, shared_deck):
+    """Test that a clone copies every card as new unless asked to keep scheduling."""
+    with app.app_context():
+        people, deck = shared_deck()
+        copy, created = clone_deck(deck, people[1])
+        assert created and copy.source_deck_id == deck.id and copy.user_id == people[1].id
+        cards = Flashcard.query.filter_by(deck_id=copy.id).order_by(Flashcard.id).all()
+        assert [card.question for card in cards] == [f"Q{i}" for i in range(5)]
+        assert {(card.interval, card.repetitions, card.ease_factor) for card in cards} == {(1, 0, 2.5)}
+        stats = db.session.get(DeckStats, copy.id)
+        assert (stats.card_count, stats.ease_sum, stats.mastered_count) == (5, 12.5, 0)
+        assert clone_deck(deck, people[1]) == (copy, False)
+
+        kept, _ = clone_deck(deck, people[2], reset_scheduling=False)
+        assert {card.interval for card in kept.flashcards} == {30}
+        assert db.session.get(DeckStats, kept.id).mastered_count == 5
+
+def test_concurrent_clone_returns_the_existing_copy(client, monkeypatch, shared_deck):
+    """Test that a clone losing the race to another request returns the winner's copy."""
+    with app.app_context():
+        people, deck = shared_deck()
+
+        def racing(deck, user_ids, *args):
+            clone_deck_to_users(deck, user_ids, *args)
+            db.session.add(Deck(title=deck.title, user_id=user_ids[0], source_deck_id=deck.id))
+            db.session.flush()
+
+        monkeypatch.setattr(cloning, "clone_deck_to_users", racing)
+        copy, created = clone_deck(deck, people[1])
+        assert not created
+        assert Deck.query.filter_by(source_deck_id=deck.id).all() == [copy]
+
+def test_fan_out_in_batches(client, shared_deck):
+    """Test that a fan-out clones once per user across batches and skips existing copies."""
+    with app.app_context():
+        people, deck = shared_deck(users=8)
+        user_ids = [person.id for person in people[1:]]
+        assert clone_deck_to_users(deck, user_ids[:2], batch_size=3) == 2
+        assert clone_deck_to_users(deck, user_ids, batch_size=3) == 5
+        assert Deck.query.filter_by(source_deck_id=deck.id).count() == 7
+        assert Flashcard.query.count() == 5 * 8
+
+        job = enqueue('clone_deck', {'deck_id': deck.id})
+        assert (job.status, job.to_dict()['result']) == ('succeeded', {'decks_created': 0})
+
+def test_clone_route(client, shared_deck, login):
+    """Test that subscribing to another user's deck redirects to the new copy."""
+    with app.app_context():
+        people, deck = shared_deck()
+        deck_id, user_id = deck.id, people[1].id
+    login(user_id)
+    response = client.post(f"/deck/{deck_id}/clone", data={"keep_scheduling": "1"})
+    with app.app_context():
+        copy = Deck.query.filter_by(source_deck_id=deck_id, user_id=user_id).one()
+        assert response.headers["Location"].endswith(f"/deck/{copy.id}")
+        assert {card.interval for card in copy.flashcards} == {30}
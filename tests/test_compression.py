@@ -0,0 +1,64 @@
+import gzip
+from flask import Response
+from app import app
+from app.compression import compress_response
+
+def test_html_is_gzipped(client):
+    """Test that pages are gzipped when the client accepts it."""
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert b"Flashcards Master" in gzip.decompress(response.data)
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+def test_no_compression_without_accept_encoding(client):
+    """Test that clients not asking for compression get the plain body."""
+    response = client.get("/")
+    assert "Content-Encoding" not in response.headers
+    assert b"Flashcards Master" in response.data
+
+def test_static_files_are_precompressed(client):
+    """Test that static assets are served from a compressed variant."""
+    response = client.get("/static/css/style.css", headers={"Accept-Encoding": "gzip"})
+    with open(app.static_folder + "/css/style.css", "rb") as file:
+        assert gzip.decompress(response.data) == file.read()
+    response.close()
+
+def test_streamed_response_is_compressed_incrementally():
+    """Test that generator responses are compressed without being buffered."""
+    consumed = []
+    def generate():
+        for i in range(100):
+            consumed.append(i)
+            yield f"row {i}\n"
+    with app.test_request_context("/", headers={"Accept-Encoding": "gzip"}):
+        response = compress_response(Response(generate(), mimetype="text/csv"))
+        assert consumed == []
+        assert response.headers["Content-Encoding"] == "gzip"
+        body = gzip.decompress(b"".join(response.response))
+    assert body.decode().splitlines()[-1] == "row 99"
+
+def test_fingerprinted_assets_are_immutable(client):
+    """Test that pages link fingerprinted assets that are cached for a year."""
+    page = client.get("/").data.decode()
+    with app.test_request_context():
+        from app.assets import asset_url
+        url = asset_url("css/style.css")
+    assert url.startswith("/assets/css/style.") and url in page
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == 365 * 24 * 60 * 60
+    response.close()
+    assert client.get("/assets/css/style.0000.css").status_code == 404
+
+def test_compressed_responses_have_weak_etags(client):
+    """Test that compression weakens the ETag but revalidation still works."""
+    response = client.get("/static/css/style.css", headers={"Accept-Encoding": "gzip"})
+    etag = response.headers["ETag"]
+    response.close()
+    assert etag.startswith('W/"')
+    revalidated = client.get("/static/css/style.css",
+                             headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert revalidated.status_code == 304
+    revalidated.close()
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+from app import app, db
+from app.imports import import_flashcards
+from app.maintenance import Budget, reconcile_deck_stats
+from app.models import DeckStats, Flashcard
+from app.read_models import deck_summaries
+
+def _stats(deck_id):
+    stats = db.session.get(DeckStats, deck_id)
+    db.session.refresh(stats)
+    return stats.card_count, round(stats.ease_sum, 6), stats.mastered_count
+
+def test_stats_follow_writes(client, make_deck):
+    """Test that adding, importing, reviewing and deleting cards keep the totals exact."""
+    with app.app_context():
+        deck = make_deck("Counted")
+        assert _stats(deck.id) == (0, 0, 0)
+        card = Flashcard(question="Q", answer="A", deck_id=deck.id)
+        db.session.add(card)
+        db.session.commit()
+        import_flashcards(deck.id, [{"question": "Imported", "answer": "A", "ease_factor": 2.0,
+                                     "interval": 30}])
+        assert _stats(deck.id) == (2, 4.5, 1)
+
+        card.update_review(1)
+        assert _stats(deck.id) == (2, 4.36, 1)
+        db.session.delete(card)
+        db.session.commit()
+        assert _stats(deck.id) == (1, 2.0, 1)
+
+def test_reconcile_repairs_drift(client, make_deck):
+    """Test that reconciliation recounts decks whose totals drifted."""
+    with app.app_context():
+        deck = make_deck("Counted")
+        db.session.add(Flashcard(question="Q", answer="A", deck_id=deck.id, interval=40))
+        db.session.commit()
+        db.session.execute(DeckStats.__table__.update().values(card_count=7))
+        db.session.commit()
+        assert reconcile_deck_stats(Budget()) == 1
+        assert _stats(deck.id) == (1, 2.5, 1)
+        assert reconcile_deck_stats(Budget()) == 0
+
+def test_dashboard_shows_stats(client, make_deck, login):
+    """Test that deck summaries combine stored totals with the due count."""
+    with app.app_context():
+        deck = make_deck("Counted")
+        now = datetime.utcnow()
+        for i in range(4):
+            db.session.add(Flashcard(question=f"Q{i}", answer="A", deck_id=deck.id,
+                                     interval=30 if i == 0 else 1,
+                                     next_review=now + timedelta(days=i - 1)))
+        db.session.commit()
+        [summary] = deck_summaries(deck.user_id, now)
+        assert (summary.card_count, summary.due_count, summary.mastered_percent) == (4, 2, 25.0)
+        user_id = deck.user_id
+    login(user_id)
+    assert b"25% mastered" in client.get("/dashboard").data
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy.engine import make_url
+
+from app import app, db
+from app.forecast import _shareable, deck_forecast, global_forecast, simulate, user_forecast
+from app.models import Flashcard
+
+NOW = datetime(2026, 1, 1, 12)
+
+def test_simulation_follows_sm2_schedule():
+    """Test that a new card is reviewed after 1, 6 and then ease-times-interval days."""
+    histogram = simulate(np.array([NOW], dtype="datetime64[us]"), np.array([1]), np.array([0]),
+                         np.array([2.5]), days=60, rating=2, now=NOW)
+    assert np.flatnonzero(histogram).tolist() == [0, 1, 7, 22, 59]
+
+def test_simulation_matches_update_review(client, make_user, make_deck):
+    """Test that the vectorized rules agree with Flashcard.update_review."""
+    with app.app_context():
+        user = make_user("planner")
+        deck = make_deck("Plan", user, [dict(question="Q", answer="A", next_review=NOW)])
+        [card] = deck.flashcards
+
+        expected, day = [], 0
+        while day < 365:
+            expected.append(day)
+            card.update_review(3)
+            day += card.interval
+        card.interval, card.repetitions, card.ease_factor, card.next_review = 1, 0, 2.5, NOW
+        db.session.commit()
+
+        histogram = deck_forecast(deck.id, days=365, rating=3, now=NOW)
+        assert np.flatnonzero(histogram).tolist() == expected
+        assert user_forecast(user.id, days=365, rating=3, now=NOW).tolist() == histogram.tolist()
+
+def test_global_forecast_sums_chunks(client, make_user, make_deck):
+    """Test that the process pool forecast equals the sum of the per-deck forecasts."""
+    with app.app_context():
+        user = make_user("fleet")
+        decks = [make_deck(f"D{i}", user) for i in range(2)]
+        for i in range(30):
+            db.session.add(Flashcard(question=f"Q{i}", answer="A", deck_id=decks[i % 2].id,
+                                     interval=i + 1, repetitions=i % 4,
+                                     next_review=NOW + timedelta(days=i - 5)))
+        db.session.commit()
+        expected = sum(deck_forecast(deck.id, days=90, now=NOW) for deck in decks)
+        total = global_forecast(days=90, workers=2, chunk_size=7, now=NOW)
+        assert total.tolist() == expected.tolist()
+        assert total[0] == 6
+
+def test_bad_intervals_still_advance():
+    """Test that zero and negative intervals move a card on by a day instead of looping."""
+    histogram = simulate(np.array([NOW, NOW], dtype="datetime64[us]"), np.array([0, -4]),
+                         np.array([5, 5]), np.array([2.5, 2.5]), days=3, rating=2, now=NOW)
+    assert histogram.tolist() == [2, 2, 0]
+
+def test_forecast_days_are_clamped(client):
+    """Test that the horizon stays between one day and FORECAST_MAX_DAYS."""
+    with app.app_context():
+        assert deck_forecast(1, days=-5, now=NOW).size == 1
+        assert deck_forecast(1, days=10 ** 9, now=NOW).size == app.config["FORECAST_MAX_DAYS"]
+
+def test_in_memory_databases_are_not_shared():
+    """Test that in-memory SQLite URLs are forecast in-process."""
+    assert _shareable(make_url("sqlite:////tmp/flashcards.db"))
+    assert _shareable(make_url("postgresql://user@localhost/flashcards"))
+    for url in ("sqlite://", "sqlite:///:memory:", "sqlite:///file::memory:?uri=true",
+                "sqlite:///file:cards?mode=memory&uri=true"):
+        assert not _shareable(make_url(url))
@@ -0,0 +1,47 @@
+from io import BytesIO
+
+from app import app
+from app.imports import import_flashcards
+from app.models import Deck, Flashcard
+
+def test_content_hash_is_normalized():
+    """Test that formatting differences do not change a card's hash."""
+    assert Flashcard.compute_content_hash("What is  2+2?\n") == \
+        Flashcard.compute_content_hash("what is 2+2?")
+
+def test_reimport_writes_nothing(client, make_deck):
+    """Test that importing the same cards twice only adds them once."""
+    with app.app_context():
+        deck = make_deck("Shared")
+        cards = [{"question": f"Q{i}", "answer": f"A{i}"} for i in range(25)]
+        assert import_flashcards(deck.id, cards, chunk_size=10) == (25, 0, 0)
+        assert import_flashcards(deck.id, cards + cards[:3], chunk_size=10) == (0, 0, 28)
+        assert Flashcard.query.filter_by(deck_id=deck.id).count() == 25
+
+def test_duplicate_update_and_merge(client, make_deck):
+    """Test that duplicates can replace or extend the existing answer."""
+    with app.app_context():
+        deck = make_deck("Shared")
+        import_flashcards(deck.id, [{"question": "Capital of France?", "answer": "Paris"}])
+        assert import_flashcards(deck.id, [{"question": "capital of france?", "answer": "Paris, FR"}],
+                                 on_duplicate="merge") == (0, 1, 0)
+        assert Flashcard.query.one().answer == "Paris\nParis, FR"
+        import_flashcards(deck.id, [{"question": "Capital of France?", "answer": "Paris"}],
+                          on_duplicate="update")
+        assert Flashcard.query.one().answer == "Paris"
+
+def test_import_only_reuses_a_chosen_deck(client, make_deck, login):
+    """Test that an import creates a new deck unless an existing one is picked."""
+    with app.app_context():
+        deck = make_deck("Shared")
+        deck_id, user_id = deck.id, deck.user_id
+    login(user_id)
+    assert b'value="%d"' % deck_id in client.get("/deck/import/json").data
+
+    for chosen in ("", str(deck_id)):
+        client.post("/deck/import/csv", data={
+            "title": "Shared", "deck_id": chosen, "file": (BytesIO(b"question,answer\nQ,A\n"), "cards.csv"),
+        }, content_type="multipart/form-data")
+    with app.app_context():
+        decks = Deck.query.filter_by(user_id=user_id, title="Shared").order_by(Deck.id).all()
+        assert [Flashcard.query.filter_by(deck_id=d.id).count() for d in decks] == [1, 1]
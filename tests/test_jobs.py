@@ -0,0 +1,184 @@
+import os
+import time
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from werkzeug.datastructures import FileStorage
+
+from app import app, db
+from app.jobs import (JobFailed, WorkerPool, cancel, claim_next, enqueue, execute, job_handler,
+                      requeue_stale, save_upload)
+from app.models import Deck, Flashcard, Job
+
+calls = []
+
+
+@job_handler('test_flaky')
+def flaky_job(context, fail_times):
+    calls.append(context.job_id)
+    if len(calls) <= fail_times:
+        raise RuntimeError('temporary')
+    return {'calls': len(calls)}
+
+
+@job_handler('test_broken')
+def broken_job(context):
+    raise JobFailed('bad input')
+
+
+@job_handler('test_steps')
+def steps_job(context, steps):
+    for step in range(steps):
+        context.progress(step + 1, steps)
+    return steps
+
+
+def test_failed_attempts_are_retried(client):
+    """Test that a failing job is retried with backoff and then fails for good."""
+    calls.clear()
+    app.config["JOBS_EAGER"] = False
+    app.config["JOBS_EMBEDDED_WORKERS"] = 0
+    app.config["JOBS_RETRY_DELAY"] = 0
+    try:
+        with app.app_context():
+            job = enqueue('test_flaky', {'fail_times': 1})
+            execute(claim_next())
+            assert db.session.get(Job, job.id).status == 'queued'
+            execute(claim_next())
+            job = db.session.get(Job, job.id)
+            assert (job.status, job.attempts, job.to_dict()['result']) == ('succeeded', 2, {'calls': 2})
+
+            calls.clear()
+            job = enqueue('test_flaky', {'fail_times': 5}, max_attempts=2)
+            execute(claim_next())
+            execute(claim_next())
+            assert claim_next() is None
+            job = db.session.get(Job, job.id)
+            assert (job.status, job.error) == ('failed', 'temporary')
+    finally:
+        app.config["JOBS_EAGER"] = True
+        app.config["JOBS_EMBEDDED_WORKERS"] = 2
+        app.config["JOBS_RETRY_DELAY"] = 30
+
+
+def test_job_failed_is_not_retried(client):
+    """Test that JobFailed ends a job on its first attempt."""
+    with app.app_context():
+        job = enqueue('test_broken')
+        assert (job.status, job.attempts, job.error) == ('failed', 1, 'bad input')
+
+
+def test_priority_and_cancellation(client):
+    """Test that higher priority jobs run first and cancelled ones never run."""
+    app.config["JOBS_EAGER"] = False
+    app.config["JOBS_EMBEDDED_WORKERS"] = 0
+    try:
+        with app.app_context():
+            low = enqueue('test_steps', {'steps': 1})
+            high = enqueue('test_steps', {'steps': 1}, priority=5)
+            dropped = enqueue('test_steps', {'steps': 1}, priority=9)
+            cancel(dropped)
+            assert claim_next() == high.id
+            execute(high.id)
+            running = db.session.get(Job, claim_next())
+            assert running.id == low.id
+            cancel(running)
+            execute(low.id)
+            assert [db.session.get(Job, job.id).status for job in (low, high, dropped)] == \
+                ['cancelled', 'succeeded', 'cancelled']
+    finally:
+        app.config["JOBS_EAGER"] = True
+        app.config["JOBS_EMBEDDED_WORKERS"] = 2
+
+
+def test_csv_import_runs_as_job(client, login):
+    """Test that an upload returns a job page and the status endpoint reports the result."""
+    user_id = login()
+    upload = BytesIO("question,answer\nQ1,A1\nQ2,A2\nQ1,A1\n".encode("utf-8"))
+    response = client.post("/deck/import/csv", data={
+        "title": "Queued", "file": (upload, "cards.csv"),
+    }, content_type="multipart/form-data")
+    assert response.status_code == 302
+    job_url = response.headers["Location"]
+
+    status = client.get(job_url + "/status").get_json()
+    assert status["status"] == "succeeded"
+    assert status["progress"]["done"] == 3
+    assert (status["result"]["created"], status["result"]["skipped"]) == (2, 1)
+    assert b"View Deck" in client.get(job_url).data
+    with app.app_context():
+        deck = Deck.query.filter_by(user_id=user_id, title="Queued").one()
+        assert Flashcard.query.filter_by(deck_id=deck.id).count() == 2
+
+
+def test_job_status_is_private(client, login):
+    """Test that users cannot see each other's jobs."""
+    login()
+    with app.app_context():
+        job = enqueue('test_steps', {'steps': 1})
+        job_id = job.id
+    assert client.get(f"/jobs/{job_id}/status").status_code == 404
+
+
+def test_cancelled_import_removes_upload(client, login):
+    """Test that cancelling an import before it runs deletes the uploaded file."""
+    user_id = login()
+    app.config["JOBS_EAGER"] = False
+    app.config["JOBS_EMBEDDED_WORKERS"] = 0
+    try:
+        with app.test_request_context():
+            path = save_upload(FileStorage(BytesIO(b"question,answer\n"), "cards.csv"), ".csv")
+            job = enqueue('import_deck', {'path': path, 'format': 'csv', 'user_id': user_id})
+            cancel(job)
+            assert db.session.get(Job, job.id).status == 'cancelled'
+            assert not os.path.exists(path)
+    finally:
+        app.config["JOBS_EAGER"] = True
+        app.config["JOBS_EMBEDDED_WORKERS"] = 2
+
+
+def test_stale_jobs_are_found_by_heartbeat(client):
+    """Test that only running jobs without a recent heartbeat are requeued."""
+    app.config["JOBS_EAGER"] = False
+    app.config["JOBS_EMBEDDED_WORKERS"] = 0
+    try:
+        with app.app_context():
+            long_ago = datetime.utcnow() - timedelta(seconds=app.config["JOBS_STALE_AFTER"] + 60)
+            alive = enqueue('test_steps', {'steps': 1})
+            dead = enqueue('test_steps', {'steps': 1})
+            for job in (alive, dead):
+                db.session.get(Job, claim_next()).started_at = long_ago
+            db.session.get(Job, dead.id).heartbeat_at = long_ago
+            db.session.commit()
+            assert requeue_stale() == 1
+            assert [db.session.get(Job, job.id).status for job in (alive, dead)] == ['running', 'queued']
+    finally:
+        app.config["JOBS_EAGER"] = True
+        app.config["JOBS_EMBEDDED_WORKERS"] = 2
+
+
+def test_running_pool_requeues_stale_jobs(client):
+    """Test that a pool already running picks up a job its crashed worker left behind."""
+    app.config["JOBS_EAGER"] = False
+    app.config["JOBS_EMBEDDED_WORKERS"] = 0
+    try:
+        with app.app_context():
+            pool = WorkerPool(1, poll_interval=0.01, requeue_interval=0.05).start()
+            try:
+                while not pool._next_requeue:
+                    time.sleep(0.01)
+                long_ago = datetime.utcnow() - timedelta(seconds=app.config["JOBS_STALE_AFTER"] + 60)
+                orphan = Job(kind='test_steps', payload='{"steps": 1}', status='running', attempts=1,
+                             started_at=long_ago, heartbeat_at=long_ago)
+                db.session.add(orphan)
+                db.session.commit()
+                deadline = time.monotonic() + 5
+                while db.session.get(Job, orphan.id).status != 'succeeded' and time.monotonic() < deadline:
+                    db.session.rollback()
+                    time.sleep(0.01)
+                assert db.session.get(Job, orphan.id).status == 'succeeded'
+            finally:
+                pool.stop()
+    finally:
+        app.config["JOBS_EAGER"] = True
+        app.config["JOBS_EMBEDDED_WORKERS"] = 2
@@ -0,0 +1,14 @@
+from app import app
+from app import loadtest
+
+def test_loadtest_runs_learners_through_the_app(client):
+    """Test that simulated learners log in, act and get reported per endpoint."""
+    with app.app_context():
+        assert loadtest.seed(2, decks_per_learner=1, cards_per_deck=5) == 2
+        assert loadtest.seed(2) == 0
+    result = loadtest.run(2, iterations=5, think_time=0)
+    assert result["errors"] == 0
+    assert result["endpoints"]["login"]["requests"] == 2
+    assert result["requests"] >= 2 * (2 + 5)
+    assert result["database"]["statements"] > 0
+    assert "p99 ms" in loadtest.format_report(result)
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from app import app, db
+from app.maintenance import (Budget, archive_notifications, compact_progress, enable_incremental_vacuum,
+                             optimize_database, run_maintenance)
+from app.models import Notification, NotificationArchive, Progress, MaintenanceCheckpoint
+
+NOW = datetime(2026, 6, 1, 12, 0)
+
+def test_archive_only_old_read_notifications(client, make_user):
+    """Test that read notifications past retention move to the archive in batches."""
+    with app.app_context():
+        user = make_user("veteran")
+        for days, is_read in [(200, True), (150, True), (100, False), (10, True)] * 3:
+            db.session.add(Notification(user_id=user.id, message=f"{days}", is_read=is_read,
+                                        timestamp=NOW - timedelta(days=days)))
+        db.session.commit()
+        assert archive_notifications(Budget(), retention_days=90, batch_size=2, now=NOW) == 6
+        assert sorted(n.message for n in Notification.query) == ["10"] * 3 + ["100"] * 3
+        assert NotificationArchive.query.count() == 6
+        assert NotificationArchive.query.first().archived_at is not None
+        assert db.session.get(MaintenanceCheckpoint, "archive_notifications").position == 0
+
+def test_compact_progress_into_weeks(client, make_user, make_deck):
+    """Test that old progress rows are summed per user, deck and week, once."""
+    with app.app_context():
+        user = make_user("veteran")
+        deck = make_deck("Old", user)
+        monday = datetime(2025, 12, 1)
+        for day in range(14):
+            db.session.add(Progress(user_id=user.id, deck_id=deck.id, cards_reviewed=1,
+                                    date=monday + timedelta(days=day, hours=9)))
+        db.session.add(Progress(user_id=user.id, deck_id=deck.id, cards_reviewed=5,
+                                date=NOW - timedelta(days=1)))
+        db.session.commit()
+
+        # a batch of 8 rows cuts the second week short; it waits for the next batch
+        assert compact_progress(Budget(), older_than_days=90, batch_size=8, now=NOW) == 12
+        rows = Progress.query.order_by(Progress.date).all()
+        assert [(p.date, p.cards_reviewed) for p in rows] == [
+            (monday, 7), (monday + timedelta(days=7), 7), (NOW - timedelta(days=1), 5)]
+        assert compact_progress(Budget(), older_than_days=90, now=NOW) == 0
+
+def test_compact_progress_skips_compacted_history(client, make_user, make_deck):
+    """Test that a run only reads the buckets past the cutoff of the last one."""
+    with app.app_context():
+        user = make_user("veteran")
+        deck = make_deck("Old", user)
+        old, recent = datetime(2025, 12, 1), datetime(2026, 4, 6)
+        for start in (old, recent):
+            for day in range(3):
+                db.session.add(Progress(user_id=user.id, deck_id=deck.id, cards_reviewed=1,
+                                        date=start + timedelta(days=day, hours=9)))
+        db.session.commit()
+
+        assert compact_progress(Budget(), older_than_days=90, now=NOW) == 2
+        cutoff = db.session.get(MaintenanceCheckpoint, "compact_progress").position
+        assert datetime(1970, 1, 5) + timedelta(days=cutoff) <= recent
+        # rows that show up behind the cutoff are left alone
+        db.session.add(Progress(user_id=user.id, deck_id=deck.id, cards_reviewed=1,
+                                date=old + timedelta(hours=9)))
+        db.session.commit()
+        assert compact_progress(Budget(), older_than_days=30, now=NOW) == 2
+        assert Progress.query.filter(Progress.date < recent).count() == 2
+
+def test_exhausted_budget_stops_and_resumes(client, make_user):
+    """Test that a run out of time leaves a checkpoint the next run resumes from."""
+    with app.app_context():
+        user = make_user("veteran")
+        db.session.add(Notification(user_id=user.id, message="old", is_read=True,
+                                    timestamp=NOW - timedelta(days=365)))
+        db.session.commit()
+        assert archive_notifications(Budget(max_seconds=-1), now=NOW) == 0
+        assert run_maintenance()["notifications_archived"] == 1
+
+def test_archive_survives_reused_notification_ids(client, make_user):
+    """Test that a notification id handed out again after archiving can be archived too."""
+    with app.app_context():
+        user = make_user("veteran")
+        for _ in range(2):
+            db.session.add(Notification(user_id=user.id, message="old", is_read=True,
+                                        timestamp=NOW - timedelta(days=365)))
+            db.session.commit()
+            assert archive_notifications(Budget(), now=NOW) == 1
+        archived = NotificationArchive.query.order_by(NotificationArchive.id).all()
+        assert [a.notification_id for a in archived] == [1, 1]
+
+def test_incremental_vacuum_runs_once_enabled(client, make_user):
+    """Test that switching SQLite to incremental auto-vacuum makes maintenance vacuum."""
+    with app.app_context():
+        enable_incremental_vacuum()
+        assert not enable_incremental_vacuum()
+        user = make_user("veteran")
+        db.session.add_all(Notification(user_id=user.id, message="x" * 200) for _ in range(500))
+        db.session.commit()
+        Notification.query.delete()
+        db.session.commit()
+        free_pages = lambda: db.session.execute(text("PRAGMA freelist_count")).scalar()
+        assert free_pages() > 0
+        assert optimize_database()
+        assert free_pages() == 0
+        assert run_maintenance()["vacuumed"]
@@ -0,0 +1,86 @@
+from datetime import datetime
+import pytest
+from app import app
+from app.imports import import_flashcards
+from app.models import Flashcard
+from app.packages import BLOCK, CODEC_NONE, CODEC_ZLIB, HEADER, PackageError, PackageReader, write_package
+
+def _write(deck, path, **kwargs):
+    with open(path, "wb") as file:
+        for chunk in write_package(deck, **kwargs):
+            file.write(chunk)
+
+def test_package_round_trip_keeps_scheduling(client, tmp_path, make_user, make_deck):
+    """Test that a package carries cards and their scheduling state."""
+    with app.app_context():
+        user = make_user("packer")
+        cards = [dict(question=f"Q{i} ✓", answer=f"A{i}", next_review=datetime(2026, 3, 1, 12, 30, i),
+                      interval=i + 1, repetitions=i, ease_factor=1.3 + i / 10) for i in range(25)]
+        deck = make_deck("Packed", user, cards, description="Zürich ✓")
+        path = tmp_path / "deck.fcdk"
+        _write(deck, path, block_size=10)
+
+        with PackageReader(path) as package:
+            assert package.meta == {"title": "Packed", "description": "Zürich ✓"}
+            cards = list(package.cards())
+        assert len(cards) == 25
+        assert cards[24] == {"question": "Q24 ✓", "answer": "A24",
+                             "next_review": datetime(2026, 3, 1, 12, 30, 24),
+                             "ease_factor": 1.3 + 24 / 10, "interval": 25,
+                             "repetitions": 24, "difficulty": 1}
+
+        copy = make_deck("Copy", user)
+        with PackageReader(path) as package:
+            assert import_flashcards(copy.id, package.cards()).created == 25
+        assert Flashcard.query.filter_by(deck_id=copy.id, interval=25).one().repetitions == 24
+
+def test_package_reader_rejects_other_files(tmp_path):
+    """Test that files that are not packages are refused."""
+    path = tmp_path / "deck.fcdk"
+    path.write_bytes(b'{"title": "json"}')
+    with pytest.raises(PackageError):
+        PackageReader(path)
+
+@pytest.mark.parametrize("codec", [CODEC_NONE, CODEC_ZLIB])
+def test_reader_closes_with_cards_half_read(client, tmp_path, codec, make_user, make_deck):
+    """Test that a reader can be closed while its cards are only partly read."""
+    with app.app_context():
+        deck = make_deck("Half", make_user("quitter"),
+                         [dict(question=f"Q{i}", answer=f"A{i}") for i in range(25)])
+        path = tmp_path / "deck.fcdk"
+        _write(deck, path, codec=codec, block_size=10)
+
+    with PackageReader(path) as package:
+        cards = package.cards()
+        assert [next(cards)["question"] for _ in range(12)][-1] == "Q11"
+    with pytest.raises(StopIteration):
+        next(cards)
+
+@pytest.mark.parametrize("codec", [CODEC_NONE, CODEC_ZLIB])
+def test_truncated_block_is_a_package_error(client, tmp_path, codec, make_user, make_deck):
+    """Test that a block cut short fails as a bad package rather than a codec error."""
+    with app.app_context():
+        deck = make_deck("Cut", make_user("cutter"), [dict(question="Q", answer="A")])
+        path = tmp_path / "deck.fcdk"
+        _write(deck, path, codec=codec)
+
+    data = path.read_bytes()
+    start = HEADER.size + HEADER.unpack_from(data)[4]
+    length, raw_length, count = BLOCK.unpack_from(data, start)
+    block = data[start + BLOCK.size:start + BLOCK.size + length - 4]
+    path.write_bytes(data[:start] + BLOCK.pack(length - 4, raw_length, count) + block
+                     + BLOCK.pack(0, 0, 0))
+    with PackageReader(path) as package:
+        with pytest.raises(PackageError):
+            list(package.cards())
+
+def test_package_download_name_is_header_safe(client, make_user, make_deck, login):
+    """Test that non-ASCII and quoted deck titles give a valid Content-Disposition."""
+    with app.app_context():
+        deck = make_deck('Zürich "✓"', make_user("namer"))
+        deck_id, user_id = deck.id, deck.user_id
+    login(user_id)
+    header = client.get(f"/deck/{deck_id}/export/package").headers["Content-Disposition"]
+    header.encode("latin-1")
+    assert header == ('attachment; filename="Zurich \\"\\".fcdk"; '
+                      "filename*=UTF-8''Z%C3%BCrich%20%22%E2%9C%93%22.fcdk")
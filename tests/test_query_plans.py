@@ -0,0 +1,113 @@
+"""
+Query-plan regression tests.
+
+Each hot route is requested against a seeded database while every SELECT it
+sends is captured. The captured queries are then run through `EXPLAIN QUERY PLAN`
+(`EXPLAIN` on PostgreSQL) and the test fails as soon as one of them reads a
+whole table instead of going through an index.
+"""
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, text
+
+from app import app, db
+from app.models import Progress, Notification, Leaderboard, Streak
+from app.templating import fragments
+
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (?!.*USING (COVERING )?INDEX)(\w+)')
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+@contextmanager
+def captured_selects():
+    """
+    collect every SELECT statement and its parameters run inside the block
+    """
+    queries = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            queries.append((statement, parameters))
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield queries
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def full_scans(statement, parameters):
+    """
+    tables the statement reads without an index
+    """
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        plan = connection.exec_driver_sql('EXPLAIN ' + statement, parameters).scalars()
+        return [match.group(1) for line in plan for match in POSTGRES_FULL_SCAN.finditer(line)]
+    plan = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+    return [match.group(2) for row in plan
+            for match in [SQLITE_FULL_SCAN.match(row[-1])] if match]
+
+
+@pytest.fixture
+def seeded(client, make_user, make_deck, login):
+    """
+    a logged in learner with a deck, history, notifications and competitors
+    """
+    fragments.clear()
+    now = datetime.utcnow()
+    with app.app_context():
+        users = [make_user(f"learner{i}") for i in range(5)]
+        deck = make_deck("Hot", users[0], [dict(question=f"Q{i}", answer=f"A{i}",
+                                                next_review=now + timedelta(days=i - 25))
+                                           for i in range(50)])
+        for i in range(50):
+            db.session.add(Progress(user_id=users[0].id, deck_id=deck.id, cards_reviewed=i,
+                                    date=now - timedelta(days=i)))
+            db.session.add(Notification(user_id=users[i % 5].id, message=f"N{i}"))
+        for i, user in enumerate(users):
+            db.session.add(Leaderboard(user_id=user.id, score=i * 10))
+            db.session.add(Streak(user_id=user.id, streak_count=i))
+        db.session.commit()
+        user_id, deck_id = users[0].id, deck.id
+    login(user_id)
+    return deck_id
+
+
+HOT_REQUESTS = [
+    ('GET', '/deck/{deck_id}/review'),
+    ('POST', '/deck/{deck_id}/review'),
+    ('GET', '/progress'),
+    ('GET', '/notifications'),
+    ('GET', '/leaderboard'),
+    ('GET', '/dashboard'),
+    ('GET', '/deck/{deck_id}/export/json'),
+    ('GET', '/deck/{deck_id}/export/csv'),
+    ('GET', '/deck/{deck_id}/export/package'),
+]
+
+
+@pytest.mark.parametrize('method, url', HOT_REQUESTS)
+def test_hot_queries_use_indexes(client, seeded, method, url):
+    """Test that the queries behind hot routes never scan a whole table."""
+    with app.app_context():
+        with captured_selects() as queries:
+            response = client.open(url.format(deck_id=seeded), method=method,
+                                   data={'difficulty': '2'})
+            response.get_data()
+        assert response.status_code in (200, 302)
+        assert queries
+        scans = {statement: tables for statement, parameters in queries
+                 for tables in [full_scans(statement, parameters)] if tables}
+        assert not scans, f'Full table scans: {scans}'
+
+
+def test_full_scans_are_detected(client):
+    """Test that the harness itself notices a query without a usable index."""
+    with app.app_context():
+        statement = str(text('SELECT * FROM flashcard WHERE answer = ?'))
+        assert full_scans(statement, ('A1',)) == ['flashcard']
@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+
+from app import app, db, read_models
+from app.models import Progress, Notification
+
+def _seed(make_deck):
+    deck = make_deck("Capitals", description="Europe", cards=[
+        {"question": f"Capital {i}?", "answer": f"City {i}"} for i in range(3)])
+    user = deck.author
+    now = datetime.utcnow()
+    for i in range(3):
+        db.session.add(Progress(user_id=user.id, deck_id=deck.id, cards_reviewed=i,
+                                date=now - timedelta(days=i)))
+        db.session.add(Notification(user_id=user.id, message=f"N{i}",
+                                    timestamp=now - timedelta(hours=i)))
+    db.session.commit()
+    return user, deck
+
+def test_read_models_return_plain_rows(client, make_deck):
+    """Test that read models return detached rows with the model attribute names."""
+    with app.app_context():
+        user, deck = _seed(make_deck)
+        user_id, deck_id = user.id, deck.id
+        db.session.expunge_all()
+        cards = read_models.deck_flashcards(deck_id)
+        assert [(card.question, card.answer) for card in cards] == \
+            [("Capital 0?", "City 0"), ("Capital 1?", "City 1"), ("Capital 2?", "City 2")]
+        assert isinstance(cards[0], read_models.FlashcardRow)
+        assert not db.session.identity_map
+        assert read_models.search_decks("Euro") == [(deck_id, "Capitals", "Europe")]
+        assert [row.cards_reviewed for row in read_models.user_progress(user_id)] == [2, 1, 0]
+        assert [row.message for row in read_models.user_notifications(user_id)] == ["N0", "N1", "N2"]
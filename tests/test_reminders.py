@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import app, db
+from app.models import Notification, Reminder
+from app.reminders import dispatch_reminders, parse_reminder_time
+
+@pytest.fixture
+def user_with_reminder(make_user, make_deck):
+    """
+    Creates a user reminded at `minute` with one card, due on Jan 1 2026 at
+    08:00 unless `due` is false.
+    """
+    def make(name, minute, due=True):
+        user = make_user(name)
+        offset = timedelta(days=-1 if due else 1)
+        make_deck(user=user, cards=[dict(question="q", answer="a",
+                                         next_review=datetime(2026, 1, 1, 8, 0) + offset)])
+        db.session.add(Reminder(user_id=user.id, minute_of_day=minute))
+        db.session.commit()
+        return user
+    return make
+
+def test_parse_reminder_time():
+    """Test that reminder times map onto minute-of-day buckets."""
+    assert parse_reminder_time("08:30") == 8 * 60 + 30
+    # getTimezoneOffset() of UTC+2 is -120; of UTC-5, 300
+    assert parse_reminder_time("08:30", -120) == 6 * 60 + 30
+    assert parse_reminder_time("21:00", 300) == 2 * 60
+
+def test_dispatch_reminders_notifies_due_users_once(client, user_with_reminder):
+    """Test that only users in the fired bucket with due cards are notified, once a day."""
+    with app.app_context():
+        now = datetime(2026, 1, 1, 8, 0)
+        due = user_with_reminder("due", 8 * 60)
+        user_with_reminder("notdue", 8 * 60, due=False)
+        user_with_reminder("later", 20 * 60)
+
+        assert dispatch_reminders(now=now, batch_size=1) == 1
+        assert dispatch_reminders(now=now) == 0
+        notifications = Notification.query.all()
+        assert [n.user_id for n in notifications] == [due.id]
+        assert notifications[0].message == "You have 1 flashcards due for review."
+
+def test_catchup_wraps_around_midnight(client, user_with_reminder):
+    """Test that buckets missed just before midnight are caught up on the next day."""
+    with app.app_context():
+        late = user_with_reminder("late", 24 * 60 - 2)
+        assert dispatch_reminders(now=datetime(2026, 1, 1, 0, 1)) == 1
+        assert dispatch_reminders(now=datetime(2026, 1, 1, 0, 2)) == 0
+        assert [n.user_id for n in Notification.query] == [late.id]
+        # the caught up reminder was the one of Dec 31, so Jan 1 still fires
+        assert dispatch_reminders(now=datetime(2026, 1, 1, 23, 58)) == 1
+        assert dispatch_reminders(now=datetime(2026, 1, 2, 0, 1)) == 0
@@ -1,3 +1,6 @@
+from app import app
+from app.models import Flashcard
+
 def test_home_route(client):
     """Test that the home page loads successfully."""
     response = client.get("/")
@@ -45,3 +48,20 @@ def test_error_handling(client):
     response = client.get("/nonexistent")
     assert response.status_code == 404
 
+
+def test_same_question_is_a_duplicate(client, make_deck, login):
+    """Test that a card asking a question already in the deck is rejected, whatever its answer."""
+    with app.app_context():
+        deck = make_deck("Math")
+        user_id, deck_id = deck.user_id, deck.id
+    login(user_id)
+    app.config["WTF_CSRF_ENABLED"] = False
+    try:
+        client.post(f"/deck/{deck_id}/add_flashcard", data={"question": "2+2?", "answer": "4"})
+        response = client.post(f"/deck/{deck_id}/add_flashcard", data={"question": "2+2?", "answer": "four"},
+                               follow_redirects=True)
+    finally:
+        app.config["WTF_CSRF_ENABLED"] = True
+    assert b"same question is already in the deck" in response.data
+    with app.app_context():
+        assert [card.answer for card in Flashcard.query.filter_by(deck_id=deck_id)] == ["4"]
@@ -0,0 +1,27 @@
+from app import app, db
+from app.models import Deck, Flashcard
+from app.templating import FragmentCache, fragments
+
+def test_fragment_cache_evicts_least_recently_used():
+    """Test that the fragment cache stays within its size."""
+    cache = FragmentCache(10)
+    cache.set("a", "12345")
+    cache.set("b", "12345")
+    cache.get("a")
+    cache.set("c", "12345")
+    assert cache.get("b") is None
+    assert cache.get("a") == "12345" and cache.size == 10
+
+def test_deck_fragment_follows_deck_version(client, make_deck, login):
+    """Test that the cached card list is refreshed when cards change."""
+    fragments.clear()
+    with app.app_context():
+        deck = make_deck("Cached")
+        user_id, deck_id = deck.user_id, deck.id
+    login(user_id)
+    assert b"First card" not in client.get(f"/deck/{deck_id}").data
+    with app.app_context():
+        db.session.add(Flashcard(question="First card", answer="a", deck_id=deck_id))
+        db.session.commit()
+        assert db.session.get(Deck, deck_id).version == 2
+    assert b"First card" in client.get(f"/deck/{deck_id}").data